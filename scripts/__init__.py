@@ -9,7 +9,15 @@ __description__ = "Sistema de OCR para processamento de documentos bancários"
 
 # Imports principais para facilitar uso do pacote
 from .config import config
-from .celery_app import celery_app
+
+
+def __getattr__(name):
+    # celery_app carregado só quando pedido: a API não precisa do módulo do worker
+    if name == 'celery_app':
+        from .celery_app import celery_app
+        globals()['celery_app'] = celery_app
+        return celery_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'config',
@@ -1,17 +1,62 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
+import asyncio
 import os
 from dotenv import load_dotenv
 
+# uvloop é opcional - sem ele usamos o loop padrão do asyncio
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
+try:
+    from scripts.config import CeleryConfig, config
+    from scripts.serializers import ACCEPT_CONTENT, RESULT_SERIALIZER
+except ImportError:
+    from config import CeleryConfig, config
+    from serializers import ACCEPT_CONTENT, RESULT_SERIALIZER
+
+# Event loop persistente do processo worker (criado em worker_process_init)
+_worker_loop = None
+
+def get_worker_loop():
+    """Retorna o event loop persistente do processo, criando-o se necessário"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        if uvloop is not None:
+            _worker_loop = uvloop.new_event_loop()
+        else:
+            _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Inicializa recursos por processo worker (após o fork)"""
+    global _worker_loop
+    # O loop herdado do processo pai não pode ser reutilizado após o fork
+    _worker_loop = None
+    if uvloop is not None:
+        uvloop.install()
+    get_worker_loop()
+
 def make_celery():
     """Cria e configura a aplicação Celery"""
     
     # URL do Redis
     redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Teto de conexões Redis por processo (broker e backend)
+    max_connections = int(os.getenv('BROKER_MAX_CONN', '10'))
+    
+    # Eventos de monitoramento só são úteis com Flower conectado
+    monitoring = os.getenv('CELERY_MONITORING', '0') == '1'
+    
     # Criar aplicação Celery
     celery = Celery(
         'walks_bank_ocr',
@@ -23,21 +68,39 @@ def make_celery():
     # Configurações do Celery
     celery.conf.update(
         # Configurações de resultado
-        result_expires=3600,  # 1 hora
+        # Chaves de resultado expiram no próprio Redis (padrão 1 hora)
+        result_expires=int(os.getenv('RESULT_TTL', '3600')),
         result_persistent=True,
         
+        # Conexões com o Redis: pools limitados, keepalive e verificação de sockets ociosos
+        broker_transport_options={
+            'max_connections': max_connections,
+            'socket_keepalive': True,
+            'health_check_interval': 60,
+            'retry_on_timeout': True,
+        },
+        redis_max_connections=max_connections,
+        redis_socket_keepalive=True,
+        redis_retry_on_timeout=True,
+        redis_backend_health_check_interval=60,
+        result_backend_always_retry=True,
+        result_backend_max_retries=3,
+        
         # Configurações de tarefa
-        task_serializer='json',
-        accept_content=['json'],
-        result_serializer='json',
+        # msgpack transporta bytes nativamente (sem base64); json aceito durante a transição
+        task_serializer='msgpack',
+        accept_content=ACCEPT_CONTENT,
+        result_serializer=RESULT_SERIALIZER,
         timezone='America/Sao_Paulo',
         enable_utc=True,
         
         # Configurações de worker
         worker_prefetch_multiplier=1,
         task_acks_late=True,
-        worker_max_tasks_per_child=1000,
-        task_track_started=True,
+        worker_max_tasks_per_child=10000,
+        # KB - reciclagem guiada por memória (CELERY_MAX_MEMORY_PER_CHILD)
+        worker_max_memory_per_child=(config.celery if config else CeleryConfig).worker_max_memory_per_child,
+        task_track_started=monitoring,
         task_time_limit=300,  # 5 minutos
         task_soft_time_limit=240,  # 4 minutos
         worker_disable_rate_limits=False,
@@ -53,11 +116,12 @@ def make_celery():
             'scripts.celery_tasks.process_audio_transcription': {'queue': 'audio_queue'},
             'scripts.celery_tasks.cleanup_old_files': {'queue': 'maintenance_queue'},
             'scripts.celery_tasks.send_webhook_notification': {'queue': 'webhook_queue'},
+            'scripts.celery_tasks.send_webhook_batch': {'queue': 'webhook_queue'},
         },
         
-        # Configurações de monitoramento
-        worker_send_task_events=True,
-        task_send_sent_event=True,
+        # Configurações de monitoramento (CELERY_MONITORING=1)
+        worker_send_task_events=monitoring,
+        task_send_sent_event=monitoring,
         
         # Configurações de beat (tarefas periódicas)
         beat_schedule={
@@ -4,45 +4,267 @@ Refatorado para eliminar dependências circulares
 """
 
 import os
+import sys
+import asyncio
+import base64
+import functools
+import hashlib
 import json
+import tempfile
 import logging
+import redis
 import requests
-import glob
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
-from celery.exceptions import Retry
+import aiohttp
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import fnmatch
+import re
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from celery.signals import worker_process_init, worker_process_shutdown
+
+# orjson é opcional - sem ele o cache de resultados usa o json da biblioteca padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import da instância única do Celery
-from scripts.celery_app import celery_app
+from scripts.celery_app import celery_app, get_worker_loop
 from scripts.config import config
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Processador OCR único por processo worker (reutiliza sessão HTTP e configuração)
+_ocr_processor = None
+
+# Sessões HTTP para webhooks (keep-alive entre tasks do mesmo processo)
+_webhook_session = None
+_async_webhook_session = None
+
+# Cliente Redis do cache de resultados OCR (um por processo worker)
+_cache_client = None
+
+WEBHOOK_HEADERS = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'WalksBank-OCR/1.0.0'
+}
+
+@worker_process_init.connect
+def reset_worker_resources(**kwargs):
+    """Descarta processador e sessões herdados do processo pai após o fork"""
+    global _ocr_processor, _webhook_session, _async_webhook_session, _cache_client
+    _ocr_processor = None
+    _webhook_session = None
+    _async_webhook_session = None
+    _cache_client = None
+
+@worker_process_shutdown.connect
+def close_worker_resources(**kwargs):
+    """Fecha as sessões HTTP assíncronas do processo no event loop persistente"""
+    async def close_sessions():
+        if _ocr_processor is not None:
+            await _ocr_processor.aclose()
+        if _async_webhook_session is not None and not _async_webhook_session.closed:
+            await _async_webhook_session.close()
+    
+    try:
+        get_worker_loop().run_until_complete(close_sessions())
+    except Exception as exc:
+        logger.warning(f"Erro ao fechar sessões HTTP do worker: {exc}")
+
+def get_webhook_session() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada para envio de webhooks"""
+    global _webhook_session
+    if _webhook_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(WEBHOOK_HEADERS)
+        _webhook_session = session
+    return _webhook_session
+
+def get_async_webhook_session() -> aiohttp.ClientSession:
+    """Retorna a sessão aiohttp do worker (deve ser chamada dentro do event loop persistente)"""
+    global _async_webhook_session
+    if _async_webhook_session is None or _async_webhook_session.closed:
+        _async_webhook_session = aiohttp.ClientSession(
+            headers=WEBHOOK_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+    return _async_webhook_session
+
+async def post_webhooks(notifications: List[tuple]) -> List[bool]:
+    """Envia vários webhooks concorrentemente, retornando o sucesso de cada um"""
+    session = get_async_webhook_session()
+    
+    async def post_one(webhook_url: str, data: Dict[str, Any]) -> bool:
+        try:
+            async with session.post(webhook_url, json=data) as response:
+                response.raise_for_status()
+                return True
+        except Exception as exc:
+            logger.error(f"Erro ao enviar webhook {webhook_url}: {str(exc)}")
+            return False
+    
+    return await asyncio.gather(*[post_one(url, data) for url, data in notifications])
+
 # Imports condicionais para evitar dependências circulares
 def get_ocr_processor():
     """Factory function para OCRProcessor - evita import circular"""
+    global _ocr_processor
+    if _ocr_processor is not None:
+        return _ocr_processor
     try:
         from scripts.ocr_integration import WalksBankOCR
-        return WalksBankOCR(api_key=config.ocr.api_key if config else None)
+        _ocr_processor = WalksBankOCR(api_key=config.ocr.api_key if config else None)
+        return _ocr_processor
     except ImportError as e:
         logger.error(f"Erro ao importar OCRProcessor: {e}")
         return None
 
+def get_cache_client() -> redis.Redis:
+    """Retorna o cliente Redis compartilhado do cache de resultados OCR"""
+    global _cache_client
+    if _cache_client is None:
+        _cache_client = redis.Redis.from_url(
+            config.redis.url,
+            socket_timeout=config.redis.socket_timeout,
+            socket_connect_timeout=config.redis.socket_connect_timeout,
+            retry_on_timeout=config.redis.retry_on_timeout
+        )
+    return _cache_client
+
+# Tamanho do bloco lido ao calcular o hash do conteúdo
+HASH_CHUNK_SIZE = 1 << 20
+
+def ocr_cache_key(file_path: str, document_type: str) -> str:
+    """Chave do cache: hash do conteúdo do arquivo + tipo do documento"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return f"ocr:{digest.hexdigest()}:{document_type}"
+
+def lookup_cached_ocr(file_path: str, document_type: str) -> tuple:
+    """Calcula a chave e busca o resultado em cache (bloqueante - executar fora do loop)"""
+    key = ocr_cache_key(file_path, document_type)
+    return key, get_cache_client().get(key)
+
+def store_cached_ocr(key: str, result: Dict[str, Any], ttl: int) -> None:
+    """Grava um resultado OCR no cache com validade de `ttl` segundos"""
+    payload = orjson.dumps(result) if orjson is not None else json.dumps(result, ensure_ascii=False).encode('utf-8')
+    get_cache_client().setex(key, ttl, payload)
+
+def memoize_ocr(ttl: Optional[int] = None):
+    """
+    Memoriza resultados OCR bem-sucedidos no Redis pelo conteúdo do arquivo
+    
+    Reenvios do mesmo arquivo para o mesmo tipo de documento são respondidos
+    pelo cache, sem nova chamada à API. Falhas do Redis apenas desativam o cache.
+    
+    Args:
+        ttl: Validade em segundos (None usa config.ocr.cache_ttl; 0 desativa)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(ocr_processor, file_path: str, document_type: str) -> Dict[str, Any]:
+            expires = config.ocr.cache_ttl if ttl is None else ttl
+            if not expires:
+                return await func(ocr_processor, file_path, document_type)
+            
+            key = None
+            try:
+                key, cached = await asyncio.to_thread(lookup_cached_ocr, file_path, document_type)
+                if cached is not None:
+                    logger.info("Resultado OCR de %s obtido do cache", document_type)
+                    return orjson.loads(cached) if orjson is not None else json.loads(cached)
+            except (OSError, ValueError, redis.RedisError) as exc:
+                logger.warning("Cache OCR indisponível para %s: %s", document_type, exc)
+            
+            result = await func(ocr_processor, file_path, document_type)
+            
+            if key is not None and result.get('success'):
+                try:
+                    await asyncio.to_thread(store_cached_ocr, key, result, expires)
+                except (TypeError, redis.RedisError) as exc:
+                    logger.warning("Falha ao gravar cache OCR de %s: %s", document_type, exc)
+            return result
+        return wrapper
+    return decorator
+
+@memoize_ocr()
+async def process_document_cached(ocr_processor, file_path: str, document_type: str) -> Dict[str, Any]:
+    """OCR de um documento, com memoização por conteúdo"""
+    return await ocr_processor.process_document(file_path, document_type)
+
+# Tamanho do bloco de decodificação base64 (múltiplo de 4 para alinhar os quanta)
+B64_CHUNK_SIZE = 4 * (1 << 18)
+
+def write_base64_content(content: str, output) -> None:
+    """Decodifica base64 em blocos direto para o arquivo, sem cópia integral em memória"""
+    if len(content) % 4:
+        # Conteúdo com quebras de linha/espaços não pode ser fatiado com segurança
+        output.write(base64.b64decode(content))
+        return
+    for start in range(0, len(content), B64_CHUNK_SIZE):
+        output.write(base64.b64decode(content[start:start + B64_CHUNK_SIZE]))
+
+# Linux: O_TMPFILE cria um inode sem nome - nada a remover, fechar o fd libera o arquivo
+USE_O_TMPFILE = sys.platform.startswith('linux') and hasattr(os, 'O_TMPFILE')
+PROC_FD_PREFIX = '/proc/self/fd/'
+
+def write_file_content(file_data: Dict[str, Any], output) -> None:
+    """Grava o conteúdo do upload - bytes crus (msgpack) ou base64 (json)"""
+    if 'bytes' in file_data:
+        output.write(file_data['bytes'])
+    else:
+        write_base64_content(file_data['content'], output)
+
+def save_anonymous_file(file_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Salva o upload em um arquivo anônimo (O_TMPFILE)
+    
+    Returns:
+        Caminho /proc/self/fd/N do arquivo, ou None se o filesystem não suportar O_TMPFILE
+    """
+    try:
+        fd = os.open(tempfile.gettempdir(), os.O_TMPFILE | os.O_RDWR, 0o600)
+    except OSError:
+        return None
+    try:
+        with os.fdopen(fd, 'wb', closefd=False) as output:
+            write_file_content(file_data, output)
+    except Exception:
+        os.close(fd)
+        raise
+    return f"{PROC_FD_PREFIX}{fd}"
+
 def save_uploaded_file(file_data: Dict[str, Any]) -> str:
     """Salva arquivo temporário para processamento"""
-    import base64
-    import tempfile
-    
     try:
-        # Decodificar base64
-        file_content = base64.b64decode(file_data['content'])
+        if USE_O_TMPFILE:
+            anonymous_path = save_anonymous_file(file_data)
+            if anonymous_path:
+                return anonymous_path
         
         # Criar arquivo temporário
         suffix = os.path.splitext(file_data.get('filename', 'temp.jpg'))[1]
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_file.write(file_content)
+            try:
+                write_file_content(file_data, temp_file)
+            except Exception:
+                temp_file.close()
+                os.remove(temp_file.name)
+                raise
             return temp_file.name
             
     except Exception as e:
@@ -50,15 +272,85 @@ def save_uploaded_file(file_data: Dict[str, Any]) -> str:
         raise
 
 def cleanup_temp_files(file_paths: List[str]) -> None:
-    """Remove arquivos temporários"""
+    """Remove arquivos temporários (ou fecha o fd de arquivos anônimos)"""
     for file_path in file_paths:
         try:
-            if os.path.exists(file_path):
+            if file_path.startswith(PROC_FD_PREFIX):
+                os.close(int(file_path[len(PROC_FD_PREFIX):]))
+                logger.debug(f"Arquivo temporário anônimo liberado: {file_path}")
+            elif os.path.exists(file_path):
                 os.remove(file_path)
                 logger.debug(f"Arquivo temporário removido: {file_path}")
         except Exception as e:
             logger.warning(f"Erro ao remover arquivo {file_path}: {e}")
 
+# Storage compartilhado com a API: único lugar de onde a task aceita ler (e remover) caminhos
+SHARED_UPLOAD_FOLDER = os.getenv('SHARED_UPLOAD_FOLDER')
+_SHARED_UPLOAD_ROOT = os.path.realpath(SHARED_UPLOAD_FOLDER) if SHARED_UPLOAD_FOLDER else None
+
+def resolve_shared_path(path: str) -> str:
+    """Resolve um caminho recebido na mensagem, recusando o que estiver fora do storage compartilhado"""
+    real_path = os.path.realpath(path)
+    if _SHARED_UPLOAD_ROOT is None or os.path.commonpath([_SHARED_UPLOAD_ROOT, real_path]) != _SHARED_UPLOAD_ROOT:
+        raise ValueError(f"Caminho fora do storage compartilhado: {path}")
+    return real_path
+
+def shared_upload_paths(documents: Dict[str, Any]) -> List[str]:
+    """Caminhos (validados) do storage compartilhado referenciados pela mensagem da task"""
+    paths = []
+    for doc_data in documents.values():
+        if isinstance(doc_data, dict) and 'path' in doc_data:
+            try:
+                paths.append(resolve_shared_path(doc_data['path']))
+            except ValueError:
+                # Já reportado como erro do documento; nunca remover fora do storage
+                continue
+    return paths
+
+def throttled_update_state(task, last_ts: float, meta: Dict[str, Any], min_interval: float = 1.0, force: bool = False) -> float:
+    """
+    Publica o progresso no backend apenas se `min_interval` segundos passaram desde o último envio
+    
+    Args:
+        task: Task Celery (bind=True)
+        last_ts: Instante (time.monotonic) do último envio
+        meta: Metadados do progresso
+        min_interval: Intervalo mínimo entre envios em segundos
+        force: Envia mesmo dentro do intervalo (marcos como início/fim)
+        
+    Returns:
+        Instante do último envio efetivo
+    """
+    now = time.monotonic()
+    if not force and now - last_ts < min_interval:
+        return last_ts
+    task.update_state(state='PROCESSING', meta=meta)
+    return now
+
+async def run_ocr_batch(ocr_processor, prepared: List[tuple], on_result) -> None:
+    """
+    Executa o OCR de vários documentos concorrentemente
+    
+    Args:
+        ocr_processor: Instância de WalksBankOCR
+        prepared: Lista de tuplas (doc_type, file_path)
+        on_result: Callback chamado com (doc_type, resultado_ou_exceção) assim que
+                   cada documento termina, sobrepondo o pós-processamento às chamadas restantes
+    """
+    semaphore = asyncio.Semaphore(config.ocr.max_concurrency)
+    
+    async def process_one(doc_type: str, file_path: str) -> tuple:
+        async with semaphore:
+            logger.info("Iniciando OCR para %s", doc_type)
+            try:
+                return doc_type, await process_document_cached(ocr_processor, file_path, doc_type)
+            except Exception as exc:
+                return doc_type, exc
+    
+    for next_done in asyncio.as_completed([process_one(doc_type, file_path) for doc_type, file_path in prepared]):
+        doc_type, ocr_result = await next_done
+        on_result(doc_type, ocr_result)
+
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
 def process_document_ocr(self, documents: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -71,6 +363,8 @@ def process_document_ocr(self, documents: Dict[str, Any]) -> Dict[str, Any]:
         Dict com resultado do processamento
     """
     task_id = self.request.id
+    started_iso = datetime.now().isoformat()
+    started_monotonic = time.monotonic()
     logger.info(f"Iniciando processamento OCR - Task ID: {task_id}")
     
     try:
@@ -84,7 +378,7 @@ def process_document_ocr(self, documents: Dict[str, Any]) -> Dict[str, Any]:
             meta={
                 'status': 'Inicializando processamento...',
                 'progress': 5,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': started_iso
             }
         )
         
@@ -93,57 +387,62 @@ def process_document_ocr(self, documents: Dict[str, Any]) -> Dict[str, Any]:
         if not ocr_processor:
             raise Exception("Falha ao inicializar processador OCR")
         
-        # Processar cada documento
+        # Salvar arquivos temporários em uma única passada síncrona
         results = {}
         total_docs = len(documents)
+        prepared = []
+        temp_files = []
         
-        for i, (doc_type, doc_data) in enumerate(documents.items()):
+        for doc_type, doc_data in documents.items():
             try:
-                logger.info(f"Processando documento {i+1}/{total_docs}: {doc_type}")
-                
-                # Atualizar progresso
-                progress = 10 + (i * 70 // total_docs)
-                self.update_state(
-                    state='PROCESSING',
-                    meta={
-                        'status': f'Processando {doc_type}...',
-                        'progress': progress,
-                        'current_document': doc_type,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                )
-                
-                # Salvar arquivo temporário se necessário
-                temp_file_path = None
-                if isinstance(doc_data, dict) and 'content' in doc_data:
-                    temp_file_path = save_uploaded_file(doc_data)
-                    file_path = temp_file_path
+                if isinstance(doc_data, dict) and 'path' in doc_data:
+                    # Upload já gravado pela API no storage compartilhado
+                    # (removido só na conclusão definitiva: um retry relê o mesmo arquivo)
+                    file_path = resolve_shared_path(doc_data['path'])
+                elif isinstance(doc_data, dict) and ('bytes' in doc_data or 'content' in doc_data):
+                    file_path = save_uploaded_file(doc_data)
+                    temp_files.append(file_path)
                 else:
                     file_path = doc_data  # Assumir que é um caminho
                 
-                logger.debug(f"Arquivo para processamento {doc_type}: {file_path}")
-                
-                # Processar OCR usando asyncio de forma síncrona
-                import asyncio
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                logger.info(f"Iniciando OCR para {doc_type}")
-                ocr_result = loop.run_until_complete(
-                    ocr_processor.process_document(file_path, doc_type)
-                )
-                
+                logger.debug("Arquivo para processamento %s: %s", doc_type, file_path)
+                prepared.append((doc_type, file_path))
+            
+            except Exception as doc_error:
+                logger.error(f"Erro crítico ao preparar documento {doc_type}: {str(doc_error)}")
+                logger.error(f"Stack trace: ", exc_info=True)
+                results[doc_type] = {
+                    'success': False,
+                    'error': f'Erro crítico: {str(doc_error)}',
+                    'processed_at': started_iso
+                }
+        
+        # Processar todos os documentos concorrentemente no event loop persistente do worker
+        loop = get_worker_loop()
+        completed = 0
+        last_progress_ts = 0.0
+        
+        def on_document_result(doc_type: str, ocr_result: Any) -> None:
+            """Registra o resultado e atualiza o progresso assim que cada documento termina"""
+            nonlocal completed, last_progress_ts
+            completed += 1
+            
+            if isinstance(ocr_result, Exception):
+                logger.error("Erro crítico ao processar documento %s: %s", doc_type, ocr_result)
+                results[doc_type] = {
+                    'success': False,
+                    'error': f'Erro crítico: {str(ocr_result)}',
+                    'processed_at': datetime.now().isoformat()
+                }
+            else:
                 # Log detalhado do resultado
-                logger.info(f"OCR {doc_type} concluído - Sucesso: {ocr_result.get('success', False)}")
+                logger.info("OCR %s concluído - Sucesso: %s", doc_type, ocr_result.get('success', False))
                 if ocr_result.get('quality_metrics'):
                     metrics = ocr_result['quality_metrics']
-                    logger.info(f"Qualidade {doc_type}: {metrics.get('score', 0):.1f}% - Campos: {metrics.get('found_fields', [])}")
+                    logger.info("Qualidade %s: %.1f%% - Campos: %s", doc_type, metrics.get('score', 0), metrics.get('found_fields', []))
                 
                 if not ocr_result.get('success', False):
-                    logger.warning(f"Falha no OCR {doc_type}: {ocr_result.get('error', 'Erro desconhecido')}")
+                    logger.warning("Falha no OCR %s: %s", doc_type, ocr_result.get('error', 'Erro desconhecido'))
                 
                 results[doc_type] = {
                     'success': ocr_result.get('success', False),
@@ -153,20 +452,26 @@ def process_document_ocr(self, documents: Dict[str, Any]) -> Dict[str, Any]:
                     'processed_at': datetime.now().isoformat(),
                     'error': ocr_result.get('error') if not ocr_result.get('success', False) else None
                 }
-                
-                # Limpar arquivo temporário
-                if temp_file_path:
-                    cleanup_temp_files([temp_file_path])
-                    logger.debug(f"Arquivo temporário removido: {temp_file_path}")
             
-            except Exception as doc_error:
-                logger.error(f"Erro crítico ao processar documento {doc_type}: {str(doc_error)}")
-                logger.error(f"Stack trace: ", exc_info=True)
-                results[doc_type] = {
-                    'success': False,
-                    'error': f'Erro crítico: {str(doc_error)}',
-                    'processed_at': datetime.now().isoformat()
-                }
+            # Progresso limitado a 1 envio por segundo, exceto no último documento
+            last_progress_ts = throttled_update_state(
+                self,
+                last_progress_ts,
+                {
+                    'status': f'Processados {completed}/{total_docs} documentos...',
+                    'progress': 10 + (completed * 70 // total_docs),
+                    'current_document': doc_type,
+                    'timestamp': datetime.now().isoformat()
+                },
+                force=completed == len(prepared)
+            )
+        
+        try:
+            loop.run_until_complete(
+                run_ocr_batch(ocr_processor, prepared, on_document_result)
+            )
+        finally:
+            cleanup_temp_files(temp_files)
         
         # Finalizar processamento
         self.update_state(
@@ -184,40 +489,45 @@ def process_document_ocr(self, documents: Dict[str, Any]) -> Dict[str, Any]:
         else:
             consolidated_data = {'error': 'OCR processor não disponível'}
         
-        # Preparar resultado final
-        successful_results = [r for r in results.values() if r.get('success', False)]
-        failed_results = [r for r in results.values() if not r.get('success', False)]
+        # Preparar resultado final (uma única passada sobre os resultados)
+        successful_docs = []
+        failed_docs = []
+        for doc_type, result in results.items():
+            (successful_docs if result.get('success', False) else failed_docs).append(doc_type)
         
         final_result = {
             'task_id': task_id,
-            'success': len(successful_results) > 0,
+            'success': len(successful_docs) > 0,
             'total_documents': total_docs,
-            'successful_documents': len(successful_results),
-            'failed_documents': len(failed_results),
+            'successful_documents': len(successful_docs),
+            'failed_documents': len(failed_docs),
             'results': results,
             'consolidated_data': consolidated_data,
-            'processing_time': datetime.now().isoformat()
+            'started_at': started_iso,
+            'processing_time': datetime.now().isoformat(),
+            'duration_ms': round((time.monotonic() - started_monotonic) * 1000, 2)
         }
         
-        # Log detalhado dos resultados finais
-        successful_docs = [doc for doc, result in results.items() if result.get('success', False)]
-        failed_docs = [doc for doc, result in results.items() if not result.get('success', False)]
-
-        logger.info(f"=== RESUMO PROCESSAMENTO OCR - Task ID: {task_id} ===")
-        logger.info(f"Total documentos: {total_docs}")
-        logger.info(f"Sucessos: {len(successful_docs)} - {successful_docs}")
-        logger.info(f"Falhas: {len(failed_docs)} - {failed_docs}")
+        # Log detalhado dos resultados finais (montado apenas se INFO estiver habilitado)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("=== RESUMO PROCESSAMENTO OCR - Task ID: %s ===", task_id)
+            logger.info("Total documentos: %s", total_docs)
+            logger.info("Sucessos: %d - %s", len(successful_docs), successful_docs)
+            logger.info("Falhas: %d - %s", len(failed_docs), failed_docs)
 
-        for doc_type, result in results.items():
-            if result.get('success'):
-                fields = list(result.get('data', {}).keys())
-                logger.info(f"✅ {doc_type}: {len(fields)} campos extraídos - {fields}")
-            else:
-                error = result.get('error', 'Erro desconhecido')
-                logger.warning(f"❌ {doc_type}: {error}")
+            for doc_type, result in results.items():
+                if result.get('success'):
+                    fields = list(result.get('data', {}).keys())
+                    logger.info("✅ %s: %d campos extraídos - %s", doc_type, len(fields), fields)
+                else:
+                    logger.warning("❌ %s: %s", doc_type, result.get('error', 'Erro desconhecido'))
 
-        logger.info("=" * 60)
+            logger.info("=" * 60)
+        else:
+            for doc_type in failed_docs:
+                logger.warning("❌ %s: %s", doc_type, results[doc_type].get('error', 'Erro desconhecido'))
         
+        cleanup_temp_files(shared_upload_paths(documents))
         logger.info(f"Processamento OCR concluído - Task ID: {task_id}")
         return final_result
         
@@ -230,6 +540,7 @@ def process_document_ocr(self, documents: Dict[str, Any]) -> Dict[str, Any]:
             raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
         
         # Falha final
+        cleanup_temp_files(shared_upload_paths(documents))
         return {
             'task_id': task_id,
             'success': False,
@@ -324,15 +635,8 @@ def send_webhook_notification(webhook_url: str, data: Dict[str, Any]) -> bool:
     try:
         logger.info(f"Enviando webhook para: {webhook_url}")
         
-        response = requests.post(
-            webhook_url,
-            json=data,
-            headers={
-                'Content-Type': 'application/json',
-                'User-Agent': 'WalksBank-OCR/1.0.0'
-            },
-            timeout=30
-        )
+        # Timeouts separados: conexão (3s) e leitura (27s)
+        response = get_webhook_session().post(webhook_url, json=data, timeout=(3, 27))
         
         response.raise_for_status()
         logger.info(f"Webhook enviado com sucesso: {webhook_url}")
@@ -342,6 +646,78 @@ def send_webhook_notification(webhook_url: str, data: Dict[str, Any]) -> bool:
         logger.error(f"Erro ao enviar webhook {webhook_url}: {str(exc)}")
         return False
 
+# Padrões da limpeza compilados uma única vez: (pasta, idade máxima em segundos, matcher)
+CLEANUP_TARGETS = [
+    # Uploads antigos (mais de 24 horas)
+    (os.getenv('UPLOAD_FOLDER', '/tmp/uploads'), 24 * 3600, re.compile(fnmatch.translate('*')).match),
+    # Logs rotacionados antigos (mais de 7 dias)
+    ("logs", 7 * 24 * 3600, re.compile(fnmatch.translate('*.log.*')).match),
+]
+if SHARED_UPLOAD_FOLDER:
+    # Uploads órfãos do storage compartilhado (task revogada, expirada ou que caiu)
+    CLEANUP_TARGETS.append((SHARED_UPLOAD_FOLDER, 24 * 3600, re.compile(fnmatch.translate('*')).match))
+
+def sweep_old_files(root: str, cutoff_ts: float, matches) -> tuple:
+    """
+    Remove arquivos de `root` aceitos por `matches` e mais antigos que `cutoff_ts`
+    
+    Returns:
+        Tupla (arquivos_removidos, bytes_removidos)
+    """
+    cleaned_files = 0
+    total_size = 0
+    
+    try:
+        entries = os.scandir(root)
+    except FileNotFoundError:
+        return 0, 0
+    
+    with entries:
+        for entry in entries:
+            if not matches(entry.name):
+                continue
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                file_stat = entry.stat(follow_symlinks=False)
+                if file_stat.st_mtime < cutoff_ts:
+                    os.unlink(entry.path)
+                    cleaned_files += 1
+                    total_size += file_stat.st_size
+                    logger.debug("Arquivo removido: %s", entry.path)
+            except FileNotFoundError:
+                # Removido por outro processo durante a varredura
+                pass
+            except OSError as file_error:
+                logger.warning("Erro ao processar arquivo %s: %s", entry.path, file_error)
+    
+    return cleaned_files, total_size
+
+@celery_app.task
+def send_webhook_batch(notifications: List[List[Any]]) -> Dict[str, Any]:
+    """
+    Task para enviar vários webhooks de uma vez, concorrentemente
+    
+    Args:
+        notifications: Lista de pares [webhook_url, data]
+        
+    Returns:
+        Dict com contagem de envios
+    """
+    logger.info(f"Enviando lote de {len(notifications)} webhooks")
+    
+    loop = get_worker_loop()
+    sent = loop.run_until_complete(post_webhooks(notifications))
+    sent_count = sum(sent)
+    
+    logger.info(f"Lote de webhooks concluído: {sent_count}/{len(sent)} enviados")
+    return {
+        'success': sent_count == len(sent),
+        'sent': sent_count,
+        'failed': len(sent) - sent_count,
+        'timestamp': datetime.now().isoformat()
+    }
+
 @celery_app.task
 def cleanup_old_files() -> Dict[str, Any]:
     """
@@ -353,45 +729,13 @@ def cleanup_old_files() -> Dict[str, Any]:
     logger.info("Iniciando limpeza de arquivos antigos")
     
     try:
-        # Limpar uploads antigos (mais de 24 horas)
-        uploads_dir = os.getenv('UPLOAD_FOLDER', '/tmp/uploads')
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        
+        now_ts = time.time()
         cleaned_files = 0
         total_size = 0
-        
-        if os.path.exists(uploads_dir):
-            for file_path in glob.glob(os.path.join(uploads_dir, "*")):
-                try:
-                    file_stat = os.stat(file_path)
-                    file_time = datetime.fromtimestamp(file_stat.st_mtime)
-                    
-                    if file_time < cutoff_time:
-                        file_size = file_stat.st_size
-                        os.remove(file_path)
-                        cleaned_files += 1
-                        total_size += file_size
-                        logger.debug(f"Arquivo removido: {file_path}")
-                        
-                except Exception as file_error:
-                    logger.warning(f"Erro ao processar arquivo {file_path}: {str(file_error)}")
-        
-        # Limpar logs antigos (mais de 7 dias)
-        logs_dir = "logs"
-        log_cutoff = datetime.now() - timedelta(days=7)
-        
-        if os.path.exists(logs_dir):
-            for log_file in glob.glob(os.path.join(logs_dir, "*.log.*")):
-                try:
-                    file_stat = os.stat(log_file)
-                    file_time = datetime.fromtimestamp(file_stat.st_mtime)
-                    
-                    if file_time < log_cutoff:
-                        os.remove(log_file)
-                        logger.debug(f"Log removido: {log_file}")
-                        
-                except Exception as log_error:
-                    logger.warning(f"Erro ao processar log {log_file}: {str(log_error)}")
+        for root, max_age, matches in CLEANUP_TARGETS:
+            count, size = sweep_old_files(root, now_ts - max_age, matches)
+            cleaned_files += count
+            total_size += size
         
         result = {
             'success': True,
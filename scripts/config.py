@@ -1,10 +1,41 @@
 import os
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+import re
+import functools
+from types import MappingProxyType
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Padrões de validação compilados uma única vez
+_CNPJ_RE = re.compile(r'^\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}$')
+_CPF_RE = re.compile(r'^\d{3}\.\d{3}\.\d{3}-\d{2}$')
+_PHONE_RE = re.compile(r'^\(\d{2}\)\s\d{4,5}-\d{4}$')
+_CEP_RE = re.compile(r'^\d{5}-\d{3}$')
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Bancos suportados (constante, não muda em tempo de execução)
+_BANKS = (
+    "001 - Banco do Brasil", "237 - Bradesco", "104 - Caixa Econômica Federal",
+    "341 - Itaú", "033 - Santander", "260 - Nu Pagamentos (Nubank)",
+    "077 - Banco Inter", "208 - BTG Pactual", "756 - Sicoob",
+    "748 - Sicredi", "212 - Banco Original", "290 - PagSeguro",
+    "323 - Mercado Pago", "380 - PicPay"
+)
+
+# Strings aceitas como verdadeiro em variáveis booleanas
+_TRUE_VALUES = frozenset({'true', '1', 'yes', 'on'})
+
+def _convert_env_value(value_str: str, value_type: type):
+    """Converte o valor textual de uma variável de ambiente para o tipo declarado"""
+    if value_type == bool:
+        return value_str.lower() in _TRUE_VALUES
+    return value_type(value_str)
+
+# Snapshot do ambiente: todas as leituras de configuração partem deste dict
+_ENV = dict(os.environ)
+
 @dataclass
 class OCRConfig:
     """Configurações do OCR com validação"""
@@ -15,6 +46,8 @@ class OCRConfig:
     temperature: float = 0.1
     timeout: int = 30
     max_file_size: int = 10 * 1024 * 1024  # 10MB
+    max_concurrency: int = 5  # Chamadas simultâneas à API por task
+    cache_ttl: int = 86400  # Validade (s) do cache de resultados por conteúdo; 0 desativa
 
     def __post_init__(self):
         """Validação após inicialização"""
@@ -30,6 +63,12 @@ class OCRConfig:
         if self.temperature < 0 or self.temperature > 2:
             raise ValueError("temperature deve estar entre 0 e 2")
 
+        if self.max_concurrency < 1:
+            raise ValueError("max_concurrency deve ser pelo menos 1")
+
+        if self.cache_ttl < 0:
+            raise ValueError("cache_ttl não pode ser negativo")
+
 @dataclass
 class RedisConfig:
     """Configurações do Redis com validação"""
@@ -47,32 +86,36 @@ class RedisConfig:
         if not (self.url.startswith('redis://') or self.url.startswith('rediss://')):
             raise ValueError("REDIS_URL deve começar com redis:// ou rediss://")
 
-@dataclass
+@dataclass(frozen=True)
 class CeleryConfig:
     """Configurações do Celery"""
     broker_url: str
     result_backend: str
-    task_serializer: str = 'json'
-    accept_content: List[str] = field(default_factory=lambda: ['json'])
-    result_serializer: str = 'json'
+    # result_serializer/accept_content vêm de serializers, onde o serializer orjson é registrado
+    task_serializer: str = 'msgpack'
     timezone: str = 'America/Sao_Paulo'
     enable_utc: bool = True
     worker_prefetch_multiplier: int = 1
     task_acks_late: bool = True
-    worker_max_tasks_per_child: int = 1000
+    worker_max_tasks_per_child: int = 10000
+    worker_max_memory_per_child: int = 512000  # KB
     task_default_retry_delay: int = 60
     task_max_retries: int = 3
 
-@dataclass
+    def to_conf(self) -> Dict[str, Any]:
+        """Settings para `celery_app.conf.update` (broker e backend vão no construtor do Celery)"""
+        return {key: value for key, value in asdict(self).items() if key not in ('broker_url', 'result_backend')}
+
+@dataclass(frozen=True)
 class ValidationRules:
-    """Regras de validação com padrões robustos"""
+    """Regras de validação com padrões robustos (pré-compilados, use `.match()`)"""
     required_fields: List[str]
-    cnpj_pattern: str = r'^\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}$'
-    cpf_pattern: str = r'^\d{3}\.\d{3}\.\d{3}-\d{2}$'
-    # CORRIGIDO: Padrão de telefone com `$$` e `$$`
-    phone_pattern: str = r'^$$\d{2}$$\s\d{4,5}-\d{4}$'
-    cep_pattern: str = r'^\d{5}-\d{3}$'
-    email_pattern: str = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    cnpj_pattern: re.Pattern = _CNPJ_RE
+    cpf_pattern: re.Pattern = _CPF_RE
+    # CORRIGIDO: Parênteses do DDD escapados, ex.: (11) 98765-4321
+    phone_pattern: re.Pattern = _PHONE_RE
+    cep_pattern: re.Pattern = _CEP_RE
+    email_pattern: re.Pattern = _EMAIL_RE
 
     # Limites de tamanho
     max_text_length: int = 500
@@ -86,19 +129,22 @@ class EnvironmentValidator:
         'OPENROUTER_API_KEY': {
             'description': 'Chave da API OpenRouter para OCR',
             'min_length': 20,
-            'example': 'sk-or-v1-...'
+            'example': 'sk-or-v1-...',
+            'sensitive': True
         },
         'REDIS_URL': {
             'description': 'URL de conexão com Redis',
             'min_length': 10,
-            'example': 'redis://localhost:6379/0'
+            'example': 'redis://localhost:6379/0',
+            'sensitive': False
         }
     }
 
     OPTIONAL_VARS = {
         'CELERY_CONCURRENCY': {'description': 'Número de workers Celery', 'default': '2', 'type': int},
-        'CELERY_MAX_TASKS_PER_CHILD': {'description': 'Máximo de tarefas por worker', 'default': '10', 'type': int},
-        'CELERY_LOG_LEVEL': {'description': 'Nível de log do Celery', 'default': 'info', 'options': ['debug', 'info', 'warning', 'error']},
+        'CELERY_MAX_TASKS_PER_CHILD': {'description': 'Máximo de tarefas por worker', 'default': '10000', 'type': int},
+        'CELERY_MAX_MEMORY_PER_CHILD': {'description': 'Memória máxima por worker (KB)', 'default': '512000', 'type': int},
+        'CELERY_LOG_LEVEL': {'description': 'Nível de log do Celery', 'default': 'info', 'options': frozenset({'debug', 'info', 'warning', 'error'})},
         'FLASK_HOST': {'description': 'Host do servidor Flask', 'default': '0.0.0.0'},
         'FLASK_PORT': {'description': 'Porta do servidor Flask', 'default': '5000', 'type': int},
         'FLASK_DEBUG': {'description': 'Modo debug do Flask', 'default': 'True', 'type': bool},
@@ -106,13 +152,24 @@ class EnvironmentValidator:
         'OCR_MAX_RETRIES': {'description': 'Número máximo de tentativas OCR', 'default': '3', 'type': int},
         'OCR_RETRY_BASE_DELAY': {'description': 'Delay base entre tentativas (segundos)', 'default': '2.0', 'type': float},
         'OCR_RETRY_MAX_DELAY': {'description': 'Delay máximo entre tentativas (segundos)', 'default': '30.0', 'type': float},
-        'OCR_RETRY_STRATEGY': {'description': 'Estratégia de retry', 'default': 'exponential_backoff', 'options': ['exponential_backoff', 'fixed_delay', 'immediate']},
-        'OCR_QUALITY_THRESHOLD': {'description': 'Threshold mínimo de qualidade (%)', 'default': '60.0', 'type': float}
+        'OCR_RETRY_JITTER': {'description': 'Jitter aplicado ao delay entre tentativas (fração, ±)', 'default': '0.5', 'type': float},
+        'OCR_RETRY_STRATEGY': {'description': 'Estratégia de retry', 'default': 'exponential_backoff', 'options': frozenset({'exponential_backoff', 'fixed_delay', 'immediate'})},
+        'OCR_QUALITY_THRESHOLD': {'description': 'Threshold mínimo de qualidade (%)', 'default': '60.0', 'type': float},
+        'OCR_MAX_CONCURRENCY': {'description': 'Chamadas OCR simultâneas por task', 'default': '5', 'type': int},
+        'OCR_CACHE_TTL': {'description': 'Validade (s) do cache de resultados OCR por conteúdo (0 desativa)', 'default': '86400', 'type': int},
+        'OCR_MAX_IMAGE_DIM': {'description': 'Lado maior máximo (px) das imagens enviadas ao OCR (0 desativa)', 'default': '1600', 'type': int},
+        'LOG_HASH_KEY': {'description': 'Chave do hash de dados sensíveis nos logs (opcional)', 'default': ''}
     }
 
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def validate_all(cls) -> Dict[str, any]:
-        """Valida todas as variáveis de ambiente"""
+        """
+        Valida todas as variáveis de ambiente
+
+        O resultado é memoizado (somente leitura): o ambiente não muda após o carregamento
+        e os workers Celery herdam o cache no fork. Use `validate_all.cache_clear()` para revalidar.
+        """
         results = {
             'valid': True,
             'errors': [],
@@ -122,7 +179,7 @@ class EnvironmentValidator:
 
         # Validar variáveis obrigatórias
         for var_name, config in cls.REQUIRED_VARS.items():
-            value = os.getenv(var_name)
+            value = _ENV.get(var_name)
 
             if not value:
                 results['valid'] = False
@@ -140,7 +197,7 @@ class EnvironmentValidator:
                 })
                 continue
 
-            if 'KEY' in var_name or 'PASSWORD' in var_name:
+            if config.get('sensitive'):
                 masked_value = f"{value[:8]}..." if len(value) > 8 else "***"
                 results['config'][var_name] = masked_value
             else:
@@ -148,38 +205,44 @@ class EnvironmentValidator:
 
         # Processar variáveis opcionais
         for var_name, config in cls.OPTIONAL_VARS.items():
-            value_str = os.getenv(var_name, config['default'])
+            value_str = _ENV.get(var_name)
+
+            # Caso comum: variável não definida - padrão já convertido na definição da classe
+            if value_str is None:
+                results['config'][var_name] = config['_default_converted']
+                continue
+
             value = value_str
 
             # Converter tipo se necessário
             if 'type' in config:
                 try:
-                    if config['type'] == bool:
-                        value = value_str.lower() in ('true', '1', 'yes', 'on')
-                    else: # int ou float
-                        value = config['type'](value_str)
+                    value = _convert_env_value(value_str, config['type'])
                 except (ValueError, TypeError):
                     results['warnings'].append({
                         'variable': var_name, 'warning': f'Valor inválido "{value_str}", usando padrão: {config["default"]}',
                         'description': config['description']
                     })
                     # Reverter para o padrão convertido corretamente
-                    default_str = config['default']
-                    if config['type'] == bool:
-                        value = default_str.lower() in ('true', '1', 'yes', 'on')
-                    else:
-                        value = config['type'](default_str)
-
+                    value = config['_default_converted']
 
             if 'options' in config and value not in config['options']:
                 results['warnings'].append({
-                    'variable': var_name, 'warning': f'Valor não reconhecido, opções válidas: {config["options"]}',
+                    'variable': var_name, 'warning': f'Valor não reconhecido, opções válidas: {", ".join(sorted(config["options"]))}',
                     'description': config['description']
                 })
 
             results['config'][var_name] = value
 
-        return results
+        results['config'] = MappingProxyType(results['config'])
+        return MappingProxyType(results)
+
+# Padrões das variáveis opcionais convertidos uma única vez
+for _var_config in EnvironmentValidator.OPTIONAL_VARS.values():
+    _var_config['_default_converted'] = (
+        _convert_env_value(_var_config['default'], _var_config['type'])
+        if 'type' in _var_config else _var_config['default']
+    )
 
 class WalksBankConfig:
     """Configuração principal do sistema com validação robusta"""
@@ -201,9 +264,20 @@ class WalksBankConfig:
         for warning in env_validation['warnings']:
             logger.warning(f"⚠️  {warning['variable']}: {warning['warning']}")
 
-        self.redis = RedisConfig(url=os.getenv('REDIS_URL'))
-        self.ocr = OCRConfig(api_key=os.getenv('OPENROUTER_API_KEY'))
-        self.celery = CeleryConfig(broker_url=self.redis.url, result_backend=self.redis.url)
+        # Valores já convertidos pelo validador (a chave da API vem mascarada, por isso lida do snapshot)
+        env = env_validation['config']
+
+        self.redis = RedisConfig(url=env['REDIS_URL'])
+        self.ocr = OCRConfig(
+            api_key=_ENV.get('OPENROUTER_API_KEY'),
+            max_concurrency=env['OCR_MAX_CONCURRENCY'],
+            cache_ttl=env['OCR_CACHE_TTL']
+        )
+        self.celery = CeleryConfig(
+            broker_url=self.redis.url,
+            result_backend=self.redis.url,
+            worker_max_memory_per_child=env['CELERY_MAX_MEMORY_PER_CHILD']
+        )
         self.validation = ValidationRules(
             required_fields=[
                 'empresa', 'cnpj', 'email', 'celular',
@@ -213,10 +287,10 @@ class WalksBankConfig:
         )
 
         self.supported_formats = {
-            'rg': ['.jpg', '.jpeg', '.png', '.pdf'],
-            'cnpj': ['.jpg', '.jpeg', '.png', '.pdf'],
-            'address': ['.jpg', '.jpeg', '.png', '.pdf'],
-            'facade': ['.jpg', '.jpeg', '.png']
+            'rg': frozenset({'.jpg', '.jpeg', '.png', '.pdf'}),
+            'cnpj': frozenset({'.jpg', '.jpeg', '.png', '.pdf'}),
+            'address': frozenset({'.jpg', '.jpeg', '.png', '.pdf'}),
+            'facade': frozenset({'.jpg', '.jpeg', '.png'})
         }
 
         self.document_types = {
@@ -227,40 +301,43 @@ class WalksBankConfig:
         }
 
         self.server = {
-            'host': os.getenv('FLASK_HOST', '0.0.0.0'),
-            'port': int(os.getenv('FLASK_PORT', '5000')),
-            'debug': os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
+            'host': env['FLASK_HOST'],
+            'port': env['FLASK_PORT'],
+            'debug': env['FLASK_DEBUG']
         }
 
         self.worker = {
-            'concurrency': int(os.getenv('CELERY_CONCURRENCY', '2')),
-            'max_tasks_per_child': int(os.getenv('CELERY_MAX_TASKS_PER_CHILD', '10')),
-            'loglevel': os.getenv('CELERY_LOG_LEVEL', 'info'),
+            'concurrency': env['CELERY_CONCURRENCY'],
+            'max_tasks_per_child': env['CELERY_MAX_TASKS_PER_CHILD'],
+            'max_memory_per_child': self.celery.worker_max_memory_per_child,
+            'loglevel': env['CELERY_LOG_LEVEL'],
             'queues': 'ocr_queue'
         }
 
         self.retry = {
-            'max_retries': int(os.getenv('OCR_MAX_RETRIES', '3')),
-            'base_delay': float(os.getenv('OCR_RETRY_BASE_DELAY', '2.0')),
-            'max_delay': float(os.getenv('OCR_RETRY_MAX_DELAY', '30.0')),
-            'strategy': os.getenv('OCR_RETRY_STRATEGY', 'exponential_backoff'),
-            'quality_threshold': float(os.getenv('OCR_QUALITY_THRESHOLD', '60.0'))
+            'max_retries': env['OCR_MAX_RETRIES'],
+            'base_delay': env['OCR_RETRY_BASE_DELAY'],
+            'max_delay': env['OCR_RETRY_MAX_DELAY'],
+            'jitter': env['OCR_RETRY_JITTER'],
+            'strategy': env['OCR_RETRY_STRATEGY'],
+            'quality_threshold': env['OCR_QUALITY_THRESHOLD']
         }
 
+        # Sumário calculado uma única vez: a configuração não muda após o carregamento
+        self._summary = self._build_summary()
+
         logger.info("✅ Configuração validada e carregada com sucesso")
 
-    def get_banks_list(self) -> List[str]:
+    def get_banks_list(self) -> Tuple[str, ...]:
         """Lista de bancos suportados"""
-        return [
-            "001 - Banco do Brasil", "237 - Bradesco", "104 - Caixa Econômica Federal",
-            "341 - Itaú", "033 - Santander", "260 - Nu Pagamentos (Nubank)",
-            "077 - Banco Inter", "208 - BTG Pactual", "756 - Sicoob",
-            "748 - Sicredi", "212 - Banco Original", "290 - PagSeguro",
-            "323 - Mercado Pago", "380 - PicPay"
-        ]
+        return _BANKS
 
     def get_summary(self) -> Dict[str, any]:
         """# CORRIGIDO: Retorna um sumário da configuração para verificação"""
+        return self._summary
+
+    def _build_summary(self) -> Dict[str, any]:
+        """Monta o sumário da configuração"""
         return {
             'status': 'valid', # Simplificado, a validação já acontece no __init__
             'components': {
@@ -275,7 +352,7 @@ class WalksBankConfig:
                 'required_fields_set': bool(self.validation.required_fields)
             },
             'document_types': len(self.document_types),
-            'supported_banks': len(self.get_banks_list())
+            'supported_banks': len(_BANKS)
         }
 
 
@@ -1,4 +1,5 @@
 from flask import Flask, request, jsonify, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -7,21 +8,30 @@ from celery import Celery
 from pydantic import ValidationError
 import os
 import time
+import logging
 import uuid
+import secrets
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Imports locais
 from scripts.config import config
+from scripts.serializers import RESULT_SERIALIZER, ACCEPT_CONTENT
 from scripts.models import (
     DocumentUploadRequest,
     SingleDocumentRequest,
     TaskCreatedResponse,
-    TaskStatusResponse,
-    ErrorResponse,
-    HealthCheckResponse,
-    ValidationResponse
+    TaskStatus,
+    ValidationResponse,
+    FastErrorResponse,
+    FastTaskStatusResponse,
+    FastHealthCheckResponse
 )
 from scripts.logging_config import setup_logging, get_logger, add_correlation_id
-from scripts.celery_tasks import process_document_ocr, process_audio_transcription
 
 # Configurar logging
 loggers = setup_logging(
@@ -35,8 +45,19 @@ loggers = setup_logging(
 logger = loggers['api']
 performance_logger = loggers['performance']
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Provider JSON do Flask baseado em orjson (encoder em Rust)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Inicializar Flask
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 # Configurações de segurança
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-secret-change-in-production')
@@ -68,40 +89,101 @@ if config:
         backend=config.celery.result_backend
     )
     celery_app.conf.update(
-        task_serializer='json',
-        accept_content=['json'],
-        result_serializer='json',
-        timezone='America/Sao_Paulo',
-        enable_utc=True,
+        config.celery.to_conf(),
+        # Mesmo formato de resultado dos workers (orjson quando disponível)
+        result_serializer=RESULT_SERIALIZER,
+        accept_content=ACCEPT_CONTENT,
+        # Limita as conexões do producer ao Redis, no mesmo teto do pool do health check
+        broker_transport_options={
+            'max_connections': config.redis.max_connections,
+            'socket_keepalive': True
+        },
+        redis_max_connections=config.redis.max_connections,
     )
 else:
     logger.error("Configuração não carregada - sistema não funcionará corretamente")
     celery_app = None
 
-# Redis para health checks
+# Valores de ambiente usados no caminho das requisições, lidos uma única vez
+APP_VERSION = os.getenv('APP_VERSION', '1.0.0')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Storage compartilhado com os workers (opcional): uploads trafegam como caminho, não como conteúdo
+SHARED_UPLOAD_FOLDER = os.getenv('SHARED_UPLOAD_FOLDER')
+if SHARED_UPLOAD_FOLDER:
+    os.makedirs(SHARED_UPLOAD_FOLDER, exist_ok=True)
+
+def build_task_documents(decoded_documents: dict) -> dict:
+    """Prepara os documentos (já decodificados) para a fila: caminho no storage compartilhado ou bytes crus"""
+    task_documents = {}
+    for doc_type, file_content in decoded_documents.items():
+        if SHARED_UPLOAD_FOLDER:
+            file_path = os.path.join(SHARED_UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{doc_type.value}")
+            with open(file_path, 'xb') as upload_file:
+                upload_file.write(file_content)
+            task_documents[doc_type.value] = {'path': file_path}
+        else:
+            # msgpack serializa bytes sem o overhead do base64
+            task_documents[doc_type.value] = {'bytes': file_content}
+    return task_documents
+
+def discard_task_documents(task_documents: dict) -> None:
+    """Remove do storage compartilhado os uploads de uma task que não chegou a ser enfileirada"""
+    for doc_data in task_documents.values():
+        if 'path' in doc_data:
+            try:
+                os.unlink(doc_data['path'])
+            except FileNotFoundError:
+                pass
+
+# Redis para health checks - pool único por processo, conexões reaproveitadas entre requests
 try:
-    redis_client = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    if config:
+        redis_pool = redis.ConnectionPool.from_url(
+            config.redis.url,
+            max_connections=config.redis.max_connections,
+            socket_timeout=config.redis.socket_timeout,
+            socket_connect_timeout=config.redis.socket_connect_timeout,
+            retry_on_timeout=config.redis.retry_on_timeout,
+            socket_keepalive=True
+        )
+    else:
+        redis_pool = redis.ConnectionPool.from_url(REDIS_URL, max_connections=20, socket_keepalive=True)
+    redis_client = redis.Redis(connection_pool=redis_pool)
 except Exception as e:
     logger.error(f"Erro ao conectar Redis: {e}")
     redis_client = None
 
+def json_response(model, status_code: int, **dump_kwargs):
+    """Serializa o modelo de resposta direto para JSON (pydantic-core), sem dict intermediário"""
+    return app.response_class(model.model_dump_json(**dump_kwargs), status=status_code, mimetype='application/json')
+
+def fast_response(response, status_code: int, exclude_none: bool = False):
+    """Serializa uma resposta dataclass (slots) sem a cópia profunda de dataclasses.asdict"""
+    body = {name: getattr(response, name) for name in response.__slots__}
+    if exclude_none:
+        body = {key: value for key, value in body.items() if value is not None}
+    return app.response_class(app.json.dumps(body), status=status_code, mimetype='application/json')
+
 # Middleware para correlation ID e logging
 @app.before_request
 def before_request():
     """Middleware executado antes de cada request"""
-    correlation_id = request.headers.get('X-Correlation-ID') or str(uuid.uuid4())
+    correlation_id = request.headers.get('X-Correlation-ID') or secrets.token_hex(16)
     g.correlation_id = correlation_id
     g.start_time = time.time()
     add_correlation_id(correlation_id)
-    logger.info(
-        f"Request iniciado: {request.method} {request.path}",
-        extra={
-            'endpoint': request.endpoint,
-            'method': request.method,
-            'remote_addr': request.remote_addr,
-            'user_agent': request.headers.get('User-Agent', '')
-        }
-    )
+    # Só monta o `extra` (e lê os headers) se o log INFO for de fato emitido
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Request iniciado: %s %s", request.method, request.path,
+            extra={
+                'endpoint': request.endpoint,
+                'method': request.method,
+                'remote_addr': request.remote_addr,
+                'user_agent': request.headers.get('User-Agent', '')
+            }
+        )
 
 @app.after_request
 def after_request(response):
@@ -116,85 +198,130 @@ def after_request(response):
             status_code=response.status_code,
             user_id=None # Você pode adicionar o ID do usuário aqui se tiver um sistema de login
         )
-        logger.info(
-            f"Request concluído: {request.method} {request.path} - {response.status_code} - {duration:.2f}ms",
-            extra={
-                'endpoint': request.endpoint,
-                'method': request.method,
-                'status_code': response.status_code,
-                'duration': duration
-            }
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Request concluído: %s %s - %s - %.2fms", request.method, request.path, response.status_code, duration,
+                extra={
+                    'endpoint': request.endpoint,
+                    'method': request.method,
+                    'status_code': response.status_code,
+                    'duration': duration
+                }
+            )
     return response
 
 # Error handlers
 @app.errorhandler(ValidationError)
 def handle_validation_error(e):
     """Handler para erros de validação Pydantic"""
-    logger.warning(f"Erro de validação: {e}")
+    logger.warning("Erro de validação: %s", e)
     validation_errors = []
     for error in e.errors():
         field = '.'.join(str(loc) for loc in error['loc'])
         validation_errors.append({'field': field, 'message': error['msg'], 'value': str(error.get('input', ''))})
-    return jsonify(ErrorResponse(error="Dados inválidos", error_code="VALIDATION_ERROR", validation_errors=validation_errors).model_dump(exclude_none=True)), 400
+    return fast_response(FastErrorResponse(error="Dados inválidos", error_code="VALIDATION_ERROR", validation_errors=validation_errors), 400, exclude_none=True)
 
 @app.errorhandler(413)
 def handle_file_too_large(e):
     """Handler para arquivos muito grandes"""
-    logger.warning(f"Arquivo muito grande: {e}")
-    return jsonify(ErrorResponse(error="Arquivo muito grande", error_code="FILE_TOO_LARGE", validation_errors=[{'field': 'file', 'message': f"Tamanho máximo permitido é {app.config['MAX_CONTENT_LENGTH']} bytes"}]).model_dump(exclude_none=True)), 413
+    logger.warning("Arquivo muito grande: %s", e)
+    return fast_response(FastErrorResponse(error="Arquivo muito grande", error_code="FILE_TOO_LARGE", validation_errors=[{'field': 'file', 'message': f"Tamanho máximo permitido é {app.config['MAX_CONTENT_LENGTH']} bytes"}]), 413, exclude_none=True)
 
 @app.errorhandler(429)
 def handle_rate_limit(e):
     """Handler para rate limiting"""
-    logger.warning(f"Rate limit excedido: {e.description}")
-    return jsonify(ErrorResponse(error="Muitas requisições", error_code="RATE_LIMIT_EXCEEDED").model_dump(exclude_none=True)), 429
+    logger.warning("Rate limit excedido: %s", e.description)
+    return fast_response(FastErrorResponse(error="Muitas requisições", error_code="RATE_LIMIT_EXCEEDED"), 429, exclude_none=True)
 
 @app.errorhandler(500)
 def handle_internal_error(e):
     """Handler para erros internos"""
-    logger.error(f"Erro interno: {e}", exc_info=True)
-    return jsonify(ErrorResponse(error="Erro interno do servidor", error_code="INTERNAL_ERROR").model_dump(exclude_none=True)), 500
+    logger.error("Erro interno: %s", e, exc_info=True)
+    return fast_response(FastErrorResponse(error="Erro interno do servidor", error_code="INTERNAL_ERROR"), 500, exclude_none=True)
 
-# Routes
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check detalhado"""
+# Health check em background: uma thread atualiza o snapshot e o /health apenas o lê
+_HEALTH_REFRESH_SEC = float(os.getenv('HEALTH_REFRESH_SEC', '5'))
+_HEALTH_SNAPSHOT = {'ts': 0.0, 'services': {}, 'status': 'starting'}
+_HEALTH_LOCK = threading.Lock()
+_health_thread = None
+
+def check_services() -> tuple:
+    """Verifica Redis e Celery (broadcast ao broker) e retorna (services, overall_status)"""
+    services = {}
+    overall_status = "healthy"
+    # Verificar Redis
     try:
-        services = {}
-        overall_status = "healthy"
-        # Verificar Redis
-        try:
-            if redis_client:
-                redis_client.ping()
-                services['redis'] = {'status': 'healthy'}
+        if redis_client:
+            redis_client.ping()
+            services['redis'] = {'status': 'healthy'}
+        else:
+            raise ConnectionError("Redis client não inicializado")
+    except Exception as e:
+        services['redis'] = {'status': 'unhealthy', 'error': str(e)}
+        overall_status = "degraded"
+    # Verificar Celery
+    try:
+        if celery_app:
+            inspect = celery_app.control.inspect(timeout=1)
+            active_workers = inspect.active()
+            if active_workers:
+                services['celery'] = {'status': 'healthy', 'workers': len(active_workers)}
             else:
-                raise ConnectionError("Redis client não inicializado")
-        except Exception as e:
-            services['redis'] = {'status': 'unhealthy', 'error': str(e)}
-            overall_status = "degraded"
-        # Verificar Celery
+                services['celery'] = {'status': 'degraded', 'message': 'Nenhum worker ativo'}
+                overall_status = "degraded"
+        else:
+            raise ConnectionError("Celery não inicializado")
+    except Exception as e:
+        services['celery'] = {'status': 'unhealthy', 'error': str(e)}
+        overall_status = "degraded"
+    return services, overall_status
+
+def refresh_health() -> None:
+    """Executa as verificações e publica um novo snapshot (troca atômica da referência)"""
+    global _HEALTH_SNAPSHOT
+    services, overall_status = check_services()
+    _HEALTH_SNAPSHOT = {'ts': time.monotonic(), 'services': services, 'status': overall_status}
+
+def _refresh_health_loop() -> None:
+    """Loop da thread de health check"""
+    while True:
+        time.sleep(_HEALTH_REFRESH_SEC)
         try:
-            if celery_app:
-                inspect = celery_app.control.inspect(timeout=1)
-                active_workers = inspect.active()
-                if active_workers:
-                    services['celery'] = {'status': 'healthy', 'workers': len(active_workers)}
-                else:
-                    services['celery'] = {'status': 'degraded', 'message': 'Nenhum worker ativo'}
-                    overall_status = "degraded"
-            else:
-                raise ConnectionError("Celery não inicializado")
+            refresh_health()
         except Exception as e:
-            services['celery'] = {'status': 'unhealthy', 'error': str(e)}
-            overall_status = "degraded"
+            logger.error(f"Erro ao atualizar health check: {e}")
 
-        response = HealthCheckResponse(status=overall_status, services=services, version=os.getenv('APP_VERSION', '1.0.0'))
+def start_health_refresher() -> None:
+    """Inicia a thread de health check uma única vez por processo (após o fork do gunicorn)"""
+    global _health_thread
+    if _health_thread is not None:
+        return
+    with _HEALTH_LOCK:
+        if _health_thread is not None:
+            return
+        refresh_health()
+        _health_thread = threading.Thread(target=_refresh_health_loop, name='health-refresher', daemon=True)
+        _health_thread.start()
+
+# Routes
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check detalhado"""
+    try:
+        start_health_refresher()
+        snapshot = _HEALTH_SNAPSHOT
+        overall_status = snapshot['status']
+        response = FastHealthCheckResponse(
+            status=overall_status,
+            services=snapshot['services'],
+            version=APP_VERSION,
+            last_check_age_sec=round(time.monotonic() - snapshot['ts'], 1)
+        )
         status_code = 200 if overall_status == "healthy" else 503
-        return jsonify(response.model_dump()), status_code
+        return fast_response(response, status_code)
     except Exception as e:
         logger.error(f"Erro no health check: {e}", exc_info=True)
-        return jsonify(ErrorResponse(error="Erro no health check", error_code="HEALTH_CHECK_ERROR").model_dump()), 500
+        return fast_response(FastErrorResponse(error="Erro no health check", error_code="HEALTH_CHECK_ERROR"), 500)
 
 
 @app.route('/api/process-documents', methods=['POST'])
@@ -204,13 +331,20 @@ def process_documents():
     try:
         request_data = request.get_json()
         if not request_data:
-            return jsonify(ErrorResponse(error="JSON inválido ou vazio", error_code="INVALID_JSON").model_dump()), 400
+            return fast_response(FastErrorResponse(error="JSON inválido ou vazio", error_code="INVALID_JSON"), 400)
         validated_request = DocumentUploadRequest(**request_data)
-        logger.info(f"Iniciando processamento de {len(validated_request.documents)} documentos", extra={'document_types': list(validated_request.documents.keys())})
-        task = process_document_ocr.delay(validated_request.documents)
+        logger.info("Iniciando processamento de %d documentos", len(validated_request.documents), extra={'document_types': list(validated_request.documents.keys())})
+        # Import tardio: processos que só servem /health não carregam a pilha de tasks/OCR
+        from scripts.celery_tasks import process_document_ocr
+        task_documents = build_task_documents(validated_request.decoded_documents)
+        try:
+            task = process_document_ocr.delay(task_documents)
+        except Exception:
+            discard_task_documents(task_documents)
+            raise
         response = TaskCreatedResponse(task_id=task.id, message="Documentos enfileirados para processamento", documents_count=len(validated_request.documents), document_types=list(validated_request.documents.keys()), estimated_time="30-60 segundos", correlation_id=g.correlation_id)
-        logger.info(f"Tarefa criada com sucesso: {task.id}", extra={'task_id': task.id})
-        return jsonify(response.model_dump()), 202
+        logger.info("Tarefa criada com sucesso: %s", task.id, extra={'task_id': task.id})
+        return json_response(response, 202)
     except ValidationError as e:
         return handle_validation_error(e)
     except Exception as e:
@@ -222,23 +356,29 @@ def get_task_status(task_id: str):
     try:
         if not celery_app:
             raise Exception("Celery não configurado")
-        task = celery_app.AsyncResult(task_id)
-        response_data = {'task_id': task_id, 'status': task.state, 'correlation_id': g.correlation_id}
-        if task.state == 'PENDING':
-            response_data.update({'message': 'Tarefa aguardando processamento', 'progress': 0})
-        elif task.state == 'PROCESSING':
-            meta = task.info or {}
-            response_data.update({'message': meta.get('status', 'Processando...'), 'progress': meta.get('progress', 0), 'current_document': meta.get('current_document'), 'phase': meta.get('phase')})
-        elif task.state == 'SUCCESS':
-            response_data.update({'message': 'Processamento concluído com sucesso', 'progress': 100, 'result': task.result})
-        elif task.state == 'FAILURE':
-            error_info = task.info or {}
-            response_data.update({'message': 'Processamento falhou', 'progress': 0, 'error': str(error_info.get('error', 'Erro desconhecido'))})
+        # Estado e metadados numa única leitura do backend (cada task.state/task.info vai ao Redis)
+        task_meta = celery_app.backend.get_task_meta(task_id)
+        state = task_meta['status']
+        info = task_meta.get('result')
+        correlation_id = g.correlation_id
+        if state == 'PENDING':
+            response = FastTaskStatusResponse(task_id=task_id, status=TaskStatus.PENDING, message='Tarefa aguardando processamento', progress=0, correlation_id=correlation_id)
+        elif state == 'PROCESSING':
+            meta = info or {}
+            response = FastTaskStatusResponse(task_id=task_id, status=TaskStatus.PROCESSING, message=meta.get('status', 'Processando...'), progress=meta.get('progress', 0), current_document=meta.get('current_document'), phase=meta.get('phase'), correlation_id=correlation_id)
+        elif state == 'SUCCESS':
+            response = FastTaskStatusResponse(task_id=task_id, status=TaskStatus.SUCCESS, message='Processamento concluído com sucesso', progress=100, result=info, correlation_id=correlation_id)
+        elif state == 'FAILURE':
+            # O backend já reconstrói a exceção da task; dict só em resultados gravados manualmente
+            if isinstance(info, BaseException):
+                error = str(info) or type(info).__name__
+            else:
+                error_info = info if isinstance(info, dict) else {}
+                error = error_info.get('error') or error_info.get('exc_message') or 'Erro desconhecido'
+            response = FastTaskStatusResponse(task_id=task_id, status=TaskStatus.FAILURE, message='Processamento falhou', progress=0, error=str(error), correlation_id=correlation_id)
         else:
-            response_data['message'] = f'Status: {task.state}'
-            response_data['progress'] = 0
-        response = TaskStatusResponse(**response_data)
-        return jsonify(response.model_dump()), 200
+            response = FastTaskStatusResponse(task_id=task_id, status=state, message=f'Status: {state}', progress=0, correlation_id=correlation_id)
+        return fast_response(response, 200)
     except Exception as e:
         return handle_internal_error(e)
 
@@ -249,7 +389,7 @@ def cancel_task(task_id: str):
         if not celery_app:
             raise Exception("Celery não configurado")
         celery_app.control.revoke(task_id, terminate=True)
-        logger.info(f"Tarefa {task_id} cancelada", extra={'task_id': task_id})
+        logger.info("Tarefa %s cancelada", task_id, extra={'task_id': task_id})
         return jsonify({'success': True, 'message': 'Tarefa cancelada com sucesso', 'task_id': task_id}), 200
     except Exception as e:
         return handle_internal_error(e)
@@ -271,6 +411,7 @@ def init_app():
     except Exception as e:
         logger.error(f"Erro na conexão Redis: {e}")
         return False
+    start_health_refresher()
     logger.info("API inicializada com sucesso")
     return True
 
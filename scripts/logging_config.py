@@ -4,47 +4,124 @@ Configuração de logs estruturados para o sistema Walks Bank OCR
 
 import logging
 import logging.config
+import logging.handlers
+import atexit
+import queue
 import json
 import sys
 import os
-from datetime import datetime
+import time
+from contextvars import ContextVar
 from typing import Dict, Any, Optional
 import traceback
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Contexto do processo lido uma única vez na carga do módulo
+_HOSTNAME = os.getenv('HOSTNAME', 'localhost')
+_ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
+
+# Arquivo de log: rotação a cada 50MB, 5 backups, escrita em blocos de 128KB
+_LOG_MAX_BYTES = 50 * 1024 * 1024
+_LOG_BACKUP_COUNT = 5
+_LOG_BUFFER_SIZE = 128 * 1024
+
+# Componente de cada logger (resolvido uma vez por nome) e os atributos extras de cada componente
+_COMPONENT_CACHE: Dict[str, Optional[str]] = {}
+_COMPONENT_FIELDS = {
+    'celery': ('task_id',),
+    'api': ('endpoint', 'method'),
+    'ocr': ('document_type',),
+}
+
+def _resolve_component(logger_name: str) -> Optional[str]:
+    """Determina o componente a partir do nome do logger"""
+    name = logger_name.lower()
+    if "celery" in name:
+        return "celery"
+    if "flask" in name:
+        return "api"
+    if "ocr" in name:
+        return "ocr"
+    return None
+
+# Parte "YYYY-MM-DDTHH:MM:SS" do último segundo formatado (registros do mesmo segundo reaproveitam)
+_TS_CACHE = (None, '')
+
+def _format_timestamp(created: float) -> str:
+    """Timestamp ISO 8601 local com microssegundos, sem criar um datetime por registro"""
+    global _TS_CACHE
+    seconds = int(created)
+    cached_seconds, prefix = _TS_CACHE
+    if cached_seconds != seconds:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))
+        _TS_CACHE = (seconds, prefix)
+    return f"{prefix}.{int((created - seconds) * 1e6):06d}"
+
 class StructuredFormatter(logging.Formatter):
     """
     Formatter personalizado para logs estruturados em JSON
     """
 
-    def __init__(self, service_name: str = "walks_bank_ocr", version: str = "1.0.0"):
+    def __init__(self, service_name: str = "walks_bank_ocr", version: str = "1.0.0", verbose: bool = False):
         super().__init__()
         self.service_name = service_name
         self.version = version
-        self.hostname = os.getenv('HOSTNAME', 'localhost')
-        self.environment = os.getenv('ENVIRONMENT', 'development')
+        # Origem (módulo/função/linha/thread/processo) só em WARNING+ ou com log em DEBUG
+        self.verbose = verbose
+        self.hostname = _HOSTNAME
+        self.environment = _ENVIRONMENT
+        # Campos fixos de todo registro - copiados em format() em vez de remontados
+        # (timestamp reservado na primeira posição para manter a ordem das chaves)
+        self._base = {
+            "timestamp": None,
+            "service": service_name,
+            "version": version,
+            "environment": _ENVIRONMENT,
+            "hostname": _HOSTNAME,
+        }
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Formata o log record em JSON estruturado
         """
-        log_entry = {
-            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
-            "service": self.service_name,
-            "version": self.version,
-            "environment": self.environment,
-            "hostname": self.hostname,
-            "level": record.levelname,
-            "logger": record.name,
-            "message": record.getMessage(),
-            "module": record.module,
-            "function": record.funcName,
-            "line": record.lineno,
-            "thread": record.thread,
-            "thread_name": record.threadName,
-            "process": record.process,
-        }
-        if hasattr(record, 'correlation_id'):
+        log_entry = self._build_entry(record)
+        if orjson is not None:
+            return orjson.dumps(log_entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(log_entry, ensure_ascii=False, default=str)
+
+    def format_bytes(self, record: logging.LogRecord) -> bytes:
+        """
+        Formata o log record direto em bytes UTF-8 (orjson já produz bytes, sem decode/encode)
+        """
+        log_entry = self._build_entry(record)
+        if orjson is not None:
+            return orjson.dumps(log_entry, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(log_entry, ensure_ascii=False, default=str).encode('utf-8')
+
+    def _build_entry(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """Monta o dicionário do registro estruturado"""
+        log_entry = self._base.copy()
+        log_entry["timestamp"] = _format_timestamp(record.created)
+        log_entry.update(
+            level=record.levelname,
+            logger=record.name,
+            message=record.getMessage(),
+        )
+        if self.verbose or record.levelno >= logging.WARNING:
+            log_entry.update(
+                module=record.module,
+                function=record.funcName,
+                line=record.lineno,
+                thread=record.thread,
+                thread_name=record.threadName,
+                process=record.process,
+            )
+        if getattr(record, 'correlation_id', '-') != '-':
             log_entry["correlation_id"] = record.correlation_id
         if hasattr(record, 'user_id'):
             log_entry["user_id"] = record.user_id
@@ -58,25 +135,23 @@ class StructuredFormatter(logging.Formatter):
                 "message": str(record.exc_info[1]) if record.exc_info[1] else None,
                 "traceback": traceback.format_exception(*record.exc_info)
             }
-        if "celery" in record.name.lower():
-            log_entry["component"] = "celery"
-            if hasattr(record, 'task_id'):
-                log_entry["task_id"] = record.task_id
-        elif "flask" in record.name.lower():
-            log_entry["component"] = "api"
-            if hasattr(record, 'endpoint'):
-                log_entry["endpoint"] = record.endpoint
-            if hasattr(record, 'method'):
-                log_entry["method"] = record.method
-        elif "ocr" in record.name.lower():
-            log_entry["component"] = "ocr"
-            if hasattr(record, 'document_type'):
-                log_entry["document_type"] = record.document_type
+        try:
+            component = _COMPONENT_CACHE[record.name]
+        except KeyError:
+            component = _COMPONENT_CACHE[record.name] = _resolve_component(record.name)
+        if component is not None:
+            log_entry["component"] = component
+            for attr in _COMPONENT_FIELDS[component]:
+                if hasattr(record, attr):
+                    log_entry[attr] = getattr(record, attr)
         if hasattr(record, 'duration'):
             log_entry["duration_ms"] = record.duration
         if hasattr(record, 'memory_usage'):
             log_entry["memory_mb"] = record.memory_usage
-        return json.dumps(log_entry, ensure_ascii=False, default=str)
+        return log_entry
+
+# Correlation ID da requisição/tarefa corrente (isolado por thread, task asyncio e greenlet)
+_correlation_id: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
 
 class ContextFilter(logging.Filter):
     """
@@ -84,10 +159,79 @@ class ContextFilter(logging.Filter):
     """
     def filter(self, record: logging.LogRecord) -> bool:
         record.timestamp_unix = record.created
+        # Sempre preenchido: o formato 'simple' referencia %(correlation_id)s
+        if not hasattr(record, 'correlation_id'):
+            record.correlation_id = _correlation_id.get() or '-'
         if not hasattr(record, 'process'):
             record.process = os.getpid()
         return True
 
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler para fila em memória: entrega o registro intacto ao listener,
+    que faz a formatação JSON e a escrita em disco fora da thread da requisição
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler com buffer de escrita: acumula registros e descarrega em blocos
+    (quando o buffer enche ou quando o listener esvazia a fila). O arquivo é aberto em
+    modo binário e recebe os bytes do StructuredFormatter sem recodificação
+    """
+    def __init__(self, filename: str, buffer_size: int = _LOG_BUFFER_SIZE, **kwargs):
+        self.buffer_size = buffer_size
+        self._size = 0
+        super().__init__(filename, **kwargs)
+
+    def _open(self):
+        mode = self.mode if 'b' in self.mode else self.mode + 'b'
+        stream = open(self.baseFilename, mode, buffering=self.buffer_size)
+        self._size = os.fstat(stream.fileno()).st_size
+        return stream
+
+    def _format_bytes(self, record: logging.LogRecord) -> bytes:
+        formatter = self.formatter
+        if isinstance(formatter, StructuredFormatter):
+            return formatter.format_bytes(record) + b'\n'
+        msg = self.format(record) + self.terminator
+        return msg.encode(self.encoding or 'utf-8', self.errors or 'strict')
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Tamanho controlado localmente: o shouldRollover padrão usa seek/tell, que forçam flush
+        try:
+            msg = self._format_bytes(record)
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self._size > 0 and self._size + len(msg) >= self.maxBytes:
+                self.doRollover()
+            self.stream.write(msg)
+            self._size += len(msg)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener que escreve em lotes: drena a fila sem bloquear e só descarrega
+    os handlers quando ela esvazia - uma escrita por rajada de registros
+    """
+    def dequeue(self, block: bool):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        for handler in self.handlers:
+            handler.flush()
+        return self.queue.get(block)
+
+def stop_listener(listener: Optional[logging.handlers.QueueListener]) -> None:
+    """Drena a fila e para o listener de arquivo (pode ser chamado mais de uma vez)"""
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
 class PerformanceLogger:
     """
     Logger especializado para métricas de performance
@@ -102,6 +246,9 @@ class PerformanceLogger:
                        status_code: int,
                        user_id: str = None):
         """Log de requisição API"""
+        level = logging.WARNING if duration_ms > 5000 else logging.INFO
+        if not self.logger.isEnabledFor(level):
+            return
         extra = {
             'endpoint': endpoint,
             'method': method,
@@ -116,8 +263,7 @@ class PerformanceLogger:
                 }
             }
         }
-        level = logging.WARNING if duration_ms > 5000 else logging.INFO
-        self.logger.log(level, f"API {method} {endpoint} - {duration_ms:.2f}ms - {status_code}", extra=extra)
+        self.logger.log(level, "API %s %s - %.2fms - %s", method, endpoint, duration_ms, status_code, extra=extra)
 
     def log_ocr_processing(self,
                           document_type: str,
@@ -126,6 +272,9 @@ class PerformanceLogger:
                           confidence: float = None,
                           task_id: str = None):
         """Log de processamento OCR"""
+        level = logging.INFO if success else logging.ERROR
+        if not self.logger.isEnabledFor(level):
+            return
         extra = {
             'document_type': document_type,
             'duration': duration_ms,
@@ -139,9 +288,8 @@ class PerformanceLogger:
                 }
             }
         }
-        level = logging.INFO if success else logging.ERROR
         status = "SUCCESS" if success else "FAILED"
-        self.logger.log(level, f"OCR {document_type} - {status} - {duration_ms:.2f}ms", extra=extra)
+        self.logger.log(level, "OCR %s - %s - %.2fms", document_type, status, duration_ms, extra=extra)
 
     def log_celery_task(self,
                        task_name: str,
@@ -150,6 +298,9 @@ class PerformanceLogger:
                        success: bool,
                        retry_count: int = 0):
         """Log de tarefa Celery"""
+        level = logging.INFO if success else logging.ERROR
+        if not self.logger.isEnabledFor(level):
+            return
         extra = {
             'task_id': task_id,
             'duration': duration_ms,
@@ -163,9 +314,8 @@ class PerformanceLogger:
                 }
             }
         }
-        level = logging.INFO if success else logging.ERROR
         status = "COMPLETED" if success else "FAILED"
-        self.logger.log(level, f"Task {task_name} - {status} - {duration_ms:.2f}ms", extra=extra)
+        self.logger.log(level, "Task %s - %s - %.2fms", task_name, status, duration_ms, extra=extra)
 
 def setup_logging(
     service_name: str = "walks_bank_ocr",
@@ -180,11 +330,12 @@ def setup_logging(
     if log_file:
         log_dir = Path(log_file).parent
         log_dir.mkdir(parents=True, exist_ok=True)
+    verbose = log_level.upper() == 'DEBUG'
     config = {
         'version': 1,
         'disable_existing_loggers': False,
         'formatters': {
-            'structured': {'()': StructuredFormatter, 'service_name': service_name, 'version': os.getenv('APP_VERSION', '1.0.0')},
+            'structured': {'()': StructuredFormatter, 'service_name': service_name, 'version': os.getenv('APP_VERSION', '1.0.0'), 'verbose': verbose},
             'simple': {'format': '%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] - %(message)s', 'datefmt': '%Y-%m-%d %H:%M:%S'}
         },
         'filters': {'context_filter': {'()': ContextFilter}},
@@ -206,21 +357,41 @@ def setup_logging(
         for logger_name in config['loggers']:
             config['loggers'][logger_name]['handlers'].append('console')
         config['root']['handlers'].append('console')
+    logging.config.dictConfig(config)
+
+    # Arquivo: a escrita (e a formatação) roda numa thread de background via QueueListener,
+    # com buffer de 128KB descarregado a cada rajada (fila vazia)
+    listener = None
     if log_file:
-        config['handlers']['file'] = {
-            'class': 'logging.handlers.RotatingFileHandler', 'level': log_level, 'formatter': 'structured' if enable_json else 'simple',
-            'filters': ['context_filter'], 'filename': log_file, 'maxBytes': 50 * 1024 * 1024, 'backupCount': 5, 'encoding': 'utf-8'
-        }
+        file_handler = BufferedRotatingFileHandler(
+            log_file, maxBytes=_LOG_MAX_BYTES, backupCount=_LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+        file_handler.setLevel(log_level)
+        if enable_json:
+            file_handler.setFormatter(StructuredFormatter(service_name=service_name, version=os.getenv('APP_VERSION', '1.0.0'), verbose=verbose))
+        else:
+            file_handler.setFormatter(logging.Formatter(config['formatters']['simple']['format'], config['formatters']['simple']['datefmt']))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = LocalQueueHandler(log_queue)
+        queue_handler.setLevel(log_level)
+        # O filtro roda na thread de origem, onde o correlation ID do contexto está visível
+        queue_handler.addFilter(ContextFilter())
+        listener = FlushingQueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(stop_listener, listener)
+
         for logger_name in config['loggers']:
-            config['loggers'][logger_name]['handlers'].append('file')
-        config['root']['handlers'].append('file')
-    logging.config.dictConfig(config)
+            logging.getLogger(logger_name).addHandler(queue_handler)
+        logging.getLogger().addHandler(queue_handler)
+
     loggers = {
         'main': logging.getLogger('walks_bank_ocr'),
         'api': logging.getLogger('walks_bank_ocr.api'),
         'celery': logging.getLogger('walks_bank_ocr.celery'),
         'ocr': logging.getLogger('walks_bank_ocr.ocr'),
-        'performance': PerformanceLogger()
+        'performance': PerformanceLogger(),
+        'listener': listener
     }
     loggers['main'].info("Sistema de logging configurado", extra={'extra_data': {'config': {'service_name': service_name, 'log_level': log_level, 'log_file': log_file, 'enable_console': enable_console, 'enable_json': enable_json}}})
     return loggers
@@ -231,12 +402,7 @@ def get_logger(name: str = "walks_bank_ocr") -> logging.Logger:
 
 def add_correlation_id(correlation_id: str):
     """Adiciona correlation ID ao contexto de logging"""
-    old_factory = logging.getLogRecordFactory()
-    def record_factory(*args, **kwargs):
-        record = old_factory(*args, **kwargs)
-        record.correlation_id = correlation_id
-        return record
-    logging.setLogRecordFactory(record_factory)
+    _correlation_id.set(correlation_id)
 
 def log_with_context(logger: logging.Logger, level: int, message: str, **context):
     """Log com contexto adicional"""
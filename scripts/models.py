@@ -2,13 +2,45 @@
 Modelos Pydantic para validação rigorosa de dados
 """
 
-from pydantic import BaseModel, Field, validator, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_serializer, field_validator, EmailStr
+from pydantic import ValidationError as PydanticValidationError
 from typing import Dict, List, Optional, Union, Any
+from dataclasses import dataclass, field
 from datetime import datetime
 import re
-import base64
+import time
+import binascii
 from enum import Enum
 
+try:
+    from scripts.utils import _CNPJ_W1, _CNPJ_W2, _CPF_W1, _CPF_W2, _check_digit
+except ImportError:
+    from utils import _CNPJ_W1, _CNPJ_W2, _CPF_W1, _CPF_W2, _check_digit
+
+# Padrão montado uma única vez (pesos e dígito verificador vêm de utils)
+_NONDIGIT = re.compile(r'[^\d]')
+
+# Tamanho máximo de arquivo e o comprimento base64 correspondente (4 chars a cada 3 bytes)
+_MAX_FILE_SIZE = 10 * 1024 * 1024
+_MAX_BASE64_LEN = _MAX_FILE_SIZE * 4 // 3 + 4
+
+# Assinaturas (magic numbers) aceitas - uma única chamada a startswith com a tupla
+_MAGIC = {b'\xff\xd8': 'jpeg', b'\x89PNG': 'png', b'%PDF': 'pdf'}
+_DOCUMENT_PREFIXES = tuple(_MAGIC)
+_IMAGE_PREFIXES = (b'\xff\xd8', b'\x89PNG')
+
+# Alfabeto base64 padrão com padding opcional - validado numa única passada antes do a2b_base64
+_B64_RE = re.compile(r'[A-Za-z0-9+/]*={0,2}')
+
+def _check_base64(value: str) -> None:
+    """Valida alfabeto e padding do base64 sem decodificar"""
+    if len(value) % 4 or not _B64_RE.fullmatch(value):
+        raise ValueError("caracteres ou padding inválidos")
+
+def _base64_decoded_len(value: str) -> int:
+    """Tamanho em bytes do base64 (já validado) calculado pelo comprimento, sem decodificar"""
+    return len(value) // 4 * 3 - (len(value) - len(value.rstrip('=')))
+
 class DocumentType(str, Enum):
     """Tipos de documento aceitos"""
     RG = "rg"
@@ -30,6 +62,8 @@ class TaskStatus(str, Enum):
 
 class DocumentUploadRequest(BaseModel):
     """Modelo para upload de documentos"""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     documents: Dict[DocumentType, str] = Field(
         ...,
         description="Dicionário com documentos em base64",
@@ -39,9 +73,13 @@ class DocumentUploadRequest(BaseModel):
         }
     )
 
-    @validator('documents')
+    # Bytes decodificados durante a validação, reaproveitados por quem enfileira o OCR
+    _decoded_documents: Dict[DocumentType, bytes] = PrivateAttr(default_factory=dict)
+
+    @field_validator('documents', mode='after')
+    @classmethod
     def validate_documents(cls, v):
-        """Valida se há pelo menos um documento e se são base64 válidos"""
+        """Valida se há pelo menos um documento não vazio, com base64, tamanho e assinatura válidos"""
         if not v:
             raise ValueError("Pelo menos um documento deve ser fornecido")
 
@@ -50,51 +88,69 @@ class DocumentUploadRequest(BaseModel):
         if not valid_docs:
             raise ValueError("Nenhum documento válido fornecido")
 
-        # Validar base64 para cada documento
         for doc_type, base64_data in valid_docs.items():
-            try:
-                # Tentar decodificar base64
-                decoded = base64.b64decode(base64_data, validate=True)
+            # Rejeitar payloads grandes pelo comprimento, antes de gastar CPU/memória decodificando
+            if len(base64_data) > _MAX_BASE64_LEN:
+                raise ValueError(f"Documento {doc_type} muito grande (máximo 10MB)")
 
-                # Verificar tamanho (máximo 10MB)
-                if len(decoded) > 10 * 1024 * 1024:
-                    raise ValueError(f"Documento {doc_type} muito grande (máximo 10MB)")
+            try:
+                _check_base64(base64_data)
+            except ValueError as e:
+                raise ValueError(f"Documento {doc_type} contém base64 inválido: {str(e)}")
 
-                # Verificar se parece ser uma imagem (magic numbers básicos)
-                if not (decoded.startswith(b'\xff\xd8') or  # JPEG
-                       decoded.startswith(b'\x89PNG') or   # PNG
-                       decoded.startswith(b'%PDF')):       # PDF
-                    raise ValueError(f"Documento {doc_type} não parece ser uma imagem ou PDF válido")
+            # Verificar tamanho (máximo 10MB)
+            if _base64_decoded_len(base64_data) > _MAX_FILE_SIZE:
+                raise ValueError(f"Documento {doc_type} muito grande (máximo 10MB)")
 
-            except Exception as e:
-                raise ValueError(f"Documento {doc_type} contém base64 inválido: {str(e)}")
+            # Verificar se parece ser uma imagem (JPEG, PNG) ou PDF - só o cabeçalho é decodificado
+            if not binascii.a2b_base64(base64_data[:8]).startswith(_DOCUMENT_PREFIXES):
+                raise ValueError(f"Documento {doc_type} não parece ser uma imagem ou PDF válido")
 
         return valid_docs
 
+    def model_post_init(self, __context: Any) -> None:
+        """Guarda os bytes decodificados (base64 já validado em validate_documents)"""
+        self._decoded_documents = {
+            doc_type: binascii.a2b_base64(base64_data) for doc_type, base64_data in self.documents.items()
+        }
+
+    @property
+    def decoded_documents(self) -> Dict[DocumentType, bytes]:
+        """Documentos já decodificados (evita um segundo b64decode)"""
+        return self._decoded_documents
+
 class SingleDocumentRequest(BaseModel):
     """Modelo para processamento de documento único"""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     document_type: DocumentType = Field(..., description="Tipo do documento")
     base64_image: str = Field(..., description="Imagem em base64")
 
-    @validator('base64_image')
+    @field_validator('base64_image', mode='after')
+    @classmethod
     def validate_base64_image(cls, v):
         """Valida se é um base64 válido de imagem"""
+        if len(v) > _MAX_BASE64_LEN:
+            raise ValueError("Imagem muito grande (máximo 10MB)")
+
         try:
-            decoded = base64.b64decode(v, validate=True)
+            _check_base64(v)
+        except ValueError as e:
+            raise ValueError(f"Base64 inválido: {str(e)}")
 
-            if len(decoded) > 10 * 1024 * 1024:
-                raise ValueError("Imagem muito grande (máximo 10MB)")
+        if _base64_decoded_len(v) > _MAX_FILE_SIZE:
+            raise ValueError("Imagem muito grande (máximo 10MB)")
 
-            if not (decoded.startswith(b'\xff\xd8') or
-                   decoded.startswith(b'\x89PNG')):
-                raise ValueError("Arquivo não é uma imagem válida")
+        # Só o cabeçalho é necessário para checar a assinatura - 8 chars base64 = 6 bytes
+        if not binascii.a2b_base64(v[:8]).startswith(_IMAGE_PREFIXES):
+            raise ValueError("Arquivo não é uma imagem válida")
 
-            return v
-        except Exception as e:
-            raise ValueError(f"Base64 inválido: {str(e)}")
+        return v
 
 class CustomerDataValidationRequest(BaseModel):
     """Modelo para validação de dados do cliente"""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     # Estabelecimento
     empresa: Optional[str] = Field(None, max_length=200)
     email: Optional[EmailStr] = None
@@ -117,43 +173,37 @@ class CustomerDataValidationRequest(BaseModel):
     agencia: Optional[str] = Field(None, pattern=r'^\d{4,5}$')
     conta: Optional[str] = Field(None, pattern=r'^\d{5,10}-?\d?$')
 
-    @validator('cnpj')
+    @field_validator('cnpj', mode='after')
+    @classmethod
     def validate_cnpj(cls, v):
         """Valida CNPJ com algoritmo oficial"""
         if not v:
             return v
 
         # Remover formatação para validação
-        clean_cnpj = re.sub(r'[^\d]', '', v)
+        clean_cnpj = _NONDIGIT.sub('', v)
 
         if len(clean_cnpj) != 14:
             raise ValueError("CNPJ deve ter 14 dígitos")
 
         # Algoritmo de validação do CNPJ
-        def calculate_digit(cnpj_digits, weights):
-            total = sum(int(digit) * weight for digit, weight in zip(cnpj_digits, weights))
-            remainder = total % 11
-            return 0 if remainder < 2 else 11 - remainder
-
-        weights1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        digit1 = calculate_digit(clean_cnpj[:12], weights1)
-
-        weights2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        digit2 = calculate_digit(clean_cnpj[:13], weights2)
+        digit1 = _check_digit(clean_cnpj[:12], _CNPJ_W1)
+        digit2 = _check_digit(clean_cnpj[:13], _CNPJ_W2)
 
         if clean_cnpj[12:14] != f"{digit1}{digit2}":
             raise ValueError("CNPJ inválido")
 
         return v
 
-    @validator('cpf')
+    @field_validator('cpf', mode='after')
+    @classmethod
     def validate_cpf(cls, v):
         """Valida CPF com algoritmo oficial"""
         if not v:
             return v
 
         # Remover formatação para validação
-        clean_cpf = re.sub(r'[^\d]', '', v)
+        clean_cpf = _NONDIGIT.sub('', v)
 
         if len(clean_cpf) != 11:
             raise ValueError("CPF deve ter 11 dígitos")
@@ -163,16 +213,8 @@ class CustomerDataValidationRequest(BaseModel):
             raise ValueError("CPF inválido")
 
         # Algoritmo de validação do CPF
-        def calculate_digit(cpf_digits, weights):
-            total = sum(int(digit) * weight for digit, weight in zip(cpf_digits, weights))
-            remainder = total % 11
-            return 0 if remainder < 2 else 11 - remainder
-
-        weights1 = list(range(10, 1, -1))
-        digit1 = calculate_digit(clean_cpf[:9], weights1)
-
-        weights2 = list(range(11, 1, -1))
-        digit2 = calculate_digit(clean_cpf[:10], weights2)
+        digit1 = _check_digit(clean_cpf[:9], _CPF_W1)
+        digit2 = _check_digit(clean_cpf[:10], _CPF_W2)
 
         if clean_cpf[9:11] != f"{digit1}{digit2}":
             raise ValueError("CPF inválido")
@@ -192,9 +234,14 @@ class ValidationError(BaseModel):
 class APIResponse(BaseModel):
     """Modelo base para respostas da API"""
     success: bool = Field(..., description="Indica se a operação foi bem-sucedida")
-    timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp da resposta")
+    # Epoch em float na construção; convertido para ISO 8601 apenas ao serializar
+    timestamp: float = Field(default_factory=time.time, description="Timestamp da resposta")
     correlation_id: Optional[str] = Field(None, description="ID de correlação para rastreamento")
 
+    @field_serializer('timestamp')
+    def serialize_timestamp(self, value: float) -> str:
+        return datetime.fromtimestamp(value).isoformat()
+
 class ErrorResponse(APIResponse):
     """Modelo para respostas de erro"""
     success: bool = Field(default=False)
@@ -232,6 +279,7 @@ class HealthCheckResponse(APIResponse):
     services: Dict[str, Dict[str, Any]] = Field(..., description="Status dos serviços")
     version: Optional[str] = Field(None, description="Versão da aplicação")
     uptime: Optional[str] = Field(None, description="Tempo de atividade")
+    last_check_age_sec: Optional[float] = Field(None, description="Idade da última verificação dos serviços (segundos)")
 
 class ValidationResponse(APIResponse):
     """Modelo para resposta de validação de dados"""
@@ -240,6 +288,53 @@ class ValidationResponse(APIResponse):
     validations: Dict[str, Dict[str, Any]] = Field(..., description="Resultado das validações")
     summary: Optional[Dict[str, Any]] = Field(None, description="Resumo das validações")
 
+# ============================================================================
+# RESPOSTAS RÁPIDAS (SAÍDA SEM VALIDAÇÃO)
+# ============================================================================
+# Respostas montadas pelo próprio servidor não precisam de validação Pydantic:
+# dataclasses com __slots__ para os endpoints mais chamados (erros, status, health)
+
+def _now_iso() -> str:
+    return datetime.now().isoformat()
+
+@dataclass(slots=True, frozen=True)
+class FastErrorResponse:
+    """Resposta de erro (mesmo formato de ErrorResponse)"""
+    error: str
+    error_code: str
+    validation_errors: Optional[List[Dict[str, Any]]] = None
+    traceback: Optional[str] = None
+    correlation_id: Optional[str] = None
+    success: bool = False
+    timestamp: str = field(default_factory=_now_iso)
+
+@dataclass(slots=True, frozen=True)
+class FastTaskStatusResponse:
+    """Resposta de status de tarefa (mesmo formato de TaskStatusResponse)"""
+    task_id: str
+    status: str
+    message: str
+    progress: int = 0
+    current_document: Optional[str] = None
+    phase: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    correlation_id: Optional[str] = None
+    success: bool = True
+    timestamp: str = field(default_factory=_now_iso)
+
+@dataclass(slots=True, frozen=True)
+class FastHealthCheckResponse:
+    """Resposta de health check (mesmo formato de HealthCheckResponse)"""
+    status: str
+    services: Dict[str, Dict[str, Any]]
+    version: Optional[str] = None
+    uptime: Optional[str] = None
+    last_check_age_sec: Optional[float] = None
+    correlation_id: Optional[str] = None
+    success: bool = True
+    timestamp: str = field(default_factory=_now_iso)
+
 # ============================================================================
 # MODELOS DE DADOS OCR
 # ============================================================================
@@ -371,28 +466,18 @@ def validate_request_model(model_class: BaseModel, data: dict) -> tuple[bool, Un
         Tuple com (sucesso, modelo_validado_ou_erros)
     """
     try:
-        validated_model = model_class(**data)
+        validated_model = model_class.model_validate(data)
         return True, validated_model
-    except Exception as e:
-        # Converter erros Pydantic para nosso formato
-        validation_errors = []
-
-        if hasattr(e, 'errors'):
-            for error in e.errors():
-                field = '.'.join(str(loc) for loc in error['loc'])
-                validation_errors.append(ValidationError(
-                    field=field,
-                    message=error['msg'],
-                    value=str(error.get('input', ''))
-                ))
-        else:
-            validation_errors.append(ValidationError(
-                field='unknown',
-                message=str(e),
-                value=''
-            ))
-
-        return False, validation_errors
+    except PydanticValidationError as e:
+        # Converter erros Pydantic para nosso formato (valor truncado para limitar memória)
+        return False, [
+            ValidationError(
+                field='.'.join(map(str, error['loc'])),
+                message=error['msg'],
+                value=str(error.get('input', ''))[:200]
+            )
+            for error in e.errors(include_url=False)
+        ]
 
 # Exemplo de uso e testes
 if __name__ == "__main__":
@@ -1,86 +1,90 @@
-import requests
+import aiohttp
 import base64
 import json
+import mmap
 import os
+import random
 from typing import Dict, List, Optional, Tuple
 import logging
-from datetime import datetime
 import re
-from pydantic import BaseModel, ValidationError
 import time
-from functools import wraps
+from functools import lru_cache, wraps
 from enum import Enum
 import asyncio
+from io import BytesIO
+from dataclasses import asdict, dataclass, field
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    from scripts.config import EnvironmentValidator
+except ImportError:
+    from config import EnvironmentValidator
+
+# Lado maior máximo (px) das imagens enviadas ao modelo - acima disso são reduzidas (0 desativa)
+_MAX_IMAGE_DIM = EnvironmentValidator.validate_all()['config']['OCR_MAX_IMAGE_DIM']
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Modelos Pydantic para validação
-class RGData(BaseModel):
-    nome_completo: Optional[str] = None
-    rg: Optional[str] = None
-    cpf: Optional[str] = None
-    data_nascimento: Optional[str] = None
-    filiacao_pai: Optional[str] = None
-    filiacao_mae: Optional[str] = None
-    naturalidade: Optional[str] = None
-    data_expedicao: Optional[str] = None
-    orgao_expedidor: Optional[str] = None
-
-class CNPJData(BaseModel):
-    razao_social: Optional[str] = None
-    nome_fantasia: Optional[str] = None
-    cnpj: Optional[str] = None
-    inscricao_estadual: Optional[str] = None
-    endereco: Optional[str] = None
-    numero: Optional[str] = None
-    complemento: Optional[str] = None
-    bairro: Optional[str] = None
-    cidade: Optional[str] = None
-    uf: Optional[str] = None
-    cep: Optional[str] = None
-    telefone: Optional[str] = None
-    email: Optional[str] = None
-    atividade_principal: Optional[str] = None
-    situacao_cadastral: Optional[str] = None
-    data_abertura: Optional[str] = None
-
-class AddressData(BaseModel):
-    tipo_documento: Optional[str] = None
-    nome_titular: Optional[str] = None
-    cpf_cnpj_titular: Optional[str] = None
-    endereco: Optional[str] = None
-    numero: Optional[str] = None
-    complemento: Optional[str] = None
-    bairro: Optional[str] = None
-    cidade: Optional[str] = None
-    uf: Optional[str] = None
-    cep: Optional[str] = None
-    data_vencimento: Optional[str] = None
-    valor: Optional[str] = None
-
-class FacadeData(BaseModel):
-    nome_estabelecimento: Optional[str] = None
-    tipo_estabelecimento: Optional[str] = None
-    endereco_visivel: Optional[str] = None
-    telefone_visivel: Optional[str] = None
-    horario_funcionamento: Optional[str] = None
-    caracteristicas: Optional[str] = None
-    qualidade_imagem: Optional[str] = None
+# Último segundo formatado: (segundo, "YYYY-MM-DDTHH:MM:SS")
+_NOW_CACHE = (None, '')
+
+def _now_iso() -> str:
+    """Equivalente a datetime.now().isoformat(), reaproveitando a parte de data/hora dentro do mesmo segundo"""
+    global _NOW_CACHE
+    now = time.time()
+    seconds = int(now)
+    cached_seconds, prefix = _NOW_CACHE
+    if cached_seconds != seconds:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))
+        _NOW_CACHE = (seconds, prefix)
+    return f"{prefix}.{int((now - seconds) * 1e6):06d}"
 
 class RetryStrategy(Enum):
     EXPONENTIAL_BACKOFF = "exponential_backoff"
     FIXED_DELAY = "fixed_delay"
     IMMEDIATE = "immediate"
 
+# Palavras-chave de erros retentáveis - usado apenas quando o erro não traz status HTTP
+_RETRYABLE_RE = re.compile(
+    r'timeout|connection|network|temporary|rate limit|server error|unavailable|\b5\d\d\b',
+    re.IGNORECASE
+)
+
+# Status HTTP transitórios (timeout, too early, rate limit, erros de servidor/gateway)
+_RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+class OCRAPIError(Exception):
+    """
+    Falha na chamada à API OCR
+    
+    Sem status HTTP (timeout, erro de conexão) é considerada transitória
+    """
+    def __init__(self, message: str, status: Optional[int] = None, retryable: Optional[bool] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = (status is None or status in _RETRYABLE_STATUS) if retryable is None else retryable
+
 class OCRRetryConfig:
     """Configuração de retry para OCR"""
     def __init__(self):
         self.max_retries = int(os.getenv('OCR_MAX_RETRIES', '3'))
         self.base_delay = float(os.getenv('OCR_RETRY_BASE_DELAY', '2.0'))  # segundos
         self.max_delay = float(os.getenv('OCR_RETRY_MAX_DELAY', '30.0'))  # segundos
+        self.jitter = float(os.getenv('OCR_RETRY_JITTER', '0.5'))  # fração aleatória (±) aplicada ao delay
         self.strategy = RetryStrategy(os.getenv('OCR_RETRY_STRATEGY', 'exponential_backoff'))
+        self.max_concurrent = int(os.getenv('OCR_MAX_CONCURRENCY', '5'))  # chamadas simultâneas à API
         self.retryable_errors = [
             'timeout',
             'connection',
@@ -95,88 +99,242 @@ class OCRRetryConfig:
         if attempt >= self.max_retries:
             return False
             
-        error_str = str(error).lower()
+        # Falhas da API já classificadas pelo status HTTP
+        retryable = getattr(error, 'retryable', None)
+        if retryable is not None:
+            return retryable
         
-        # Erros que sempre devem ser retentados
-        retryable_keywords = [
-            'timeout', 'connection', 'network', 'temporary',
-            'rate limit', 'server error', '5', 'unavailable'
-        ]
-        
-        return any(keyword in error_str for keyword in retryable_keywords)
+        # Demais erros: classificação pela mensagem
+        return _RETRYABLE_RE.search(str(error)) is not None
     
     def get_delay(self, attempt: int) -> float:
-        """Calcula delay baseado na estratégia"""
+        """Calcula delay baseado na estratégia (com jitter para dessincronizar retentativas concorrentes)"""
         if self.strategy == RetryStrategy.IMMEDIATE:
             return 0
         elif self.strategy == RetryStrategy.FIXED_DELAY:
-            return self.base_delay
+            delay = self.base_delay
         else:  # EXPONENTIAL_BACKOFF
             delay = self.base_delay * (2 ** attempt)
-            return min(delay, self.max_delay)
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return min(delay, self.max_delay)
+
+@lru_cache(maxsize=1)
+def _default_retry_config() -> OCRRetryConfig:
+    """Configuração de retry padrão (variáveis de ambiente), criada no primeiro uso"""
+    return OCRRetryConfig()
 
 def retry_ocr(retry_config: OCRRetryConfig = None):
-    """Decorator para retry automático em operações OCR"""
-    if retry_config is None:
-        retry_config = OCRRetryConfig()
+    """
+    Decorator para retry automático em operações OCR
     
+    Sem configuração explícita, usa a retry_config da instância (self) no momento da chamada
+    """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            config = retry_config or getattr(args[0] if args else None, 'retry_config', None) or _default_retry_config()
             last_exception = None
             
-            for attempt in range(retry_config.max_retries + 1):
+            for attempt in range(config.max_retries + 1):
                 try:
                     # Log da tentativa
                     if attempt > 0:
-                        logger.warning(f"Tentativa {attempt + 1}/{retry_config.max_retries + 1} para {func.__name__}")
+                        logger.warning("Tentativa %d/%d para %s", attempt + 1, config.max_retries + 1, func.__name__)
                     
                     result = await func(*args, **kwargs)
                     
                     # Verificar se o resultado indica falha que deve ser retentada
                     if isinstance(result, dict) and not result.get('success', True):
-                        error_msg = result.get('error', '')
-                        if retry_config.should_retry(Exception(error_msg), attempt):
-                            last_exception = Exception(error_msg)
-                            if attempt < retry_config.max_retries:
-                                delay = retry_config.get_delay(attempt)
-                                logger.info(f"Resultado indica falha retentável. Aguardando {delay}s antes da próxima tentativa...")
+                        error = Exception(result.get('error', ''))
+                        if 'retryable' in result:
+                            error = OCRAPIError(str(error), result.get('status_code'), result['retryable'])
+                        if config.should_retry(error, attempt):
+                            last_exception = error
+                            if attempt < config.max_retries:
+                                delay = config.get_delay(attempt)
+                                logger.info("Resultado indica falha retentável. Aguardando %ss antes da próxima tentativa...", delay)
                                 await asyncio.sleep(delay)
                                 continue
                     
                     # Sucesso ou falha não retentável
                     if attempt > 0:
-                        logger.info(f"Sucesso na tentativa {attempt + 1}")
+                        logger.info("Sucesso na tentativa %d", attempt + 1)
                     
                     return result
                     
                 except Exception as e:
                     last_exception = e
                     
-                    if not retry_config.should_retry(e, attempt):
-                        logger.error(f"Erro não retentável em {func.__name__}: {e}")
+                    if not config.should_retry(e, attempt):
+                        logger.error("Erro não retentável em %s: %s", func.__name__, e)
                         break
                     
-                    if attempt < retry_config.max_retries:
-                        delay = retry_config.get_delay(attempt)
-                        logger.warning(f"Erro retentável em {func.__name__}: {e}. Tentando novamente em {delay}s...")
+                    if attempt < config.max_retries:
+                        delay = config.get_delay(attempt)
+                        logger.warning("Erro retentável em %s: %s. Tentando novamente em %ss...", func.__name__, e, delay)
                         await asyncio.sleep(delay)
                     else:
-                        logger.error(f"Máximo de tentativas excedido para {func.__name__}: {e}")
+                        logger.error("Máximo de tentativas excedido para %s: %s", func.__name__, e)
             
             # Se chegou aqui, todas as tentativas falharam
             return {
                 'success': False,
-                'error': f'Falha após {retry_config.max_retries + 1} tentativas: {str(last_exception)}',
-                'retry_attempts': retry_config.max_retries + 1,
+                'error': f'Falha após {config.max_retries + 1} tentativas: {str(last_exception)}',
+                'retry_attempts': config.max_retries + 1,
                 'last_error': str(last_exception),
-                'processed_at': datetime.now().isoformat()
+                'processed_at': _now_iso()
             }
         
         return wrapper
     return decorator
 
+# Padrões de extração compilados uma única vez na carga do módulo
+_I = re.IGNORECASE
+_IM = re.IGNORECASE | re.MULTILINE
+_JSON_PATS = [re.compile(p, re.DOTALL | re.IGNORECASE) for p in (
+    r'\`\`\`json\s*(\{.*?\})\s*\`\`\`',
+    r'\`\`\`\s*(\{.*?\})\s*\`\`\`',
+    r'(\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\})'
+)]
+_RG_NOME_PATS = [re.compile(p, _IM) for p in (
+    r'nome[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s]{10,})',
+    r'nome completo[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s]{10,})',
+    r'^([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s]{15,})$'  # Linha com nome longo
+)]
+# Data, CPF e CNPJ: o padrão sem rótulo já cobre as variantes "nascimento:", "cpf:", "cnpj:"
+# e sua estrutura garante a quantidade exata de dígitos
+_DATA_RE = re.compile(r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{4})')
+_CPF_RE = re.compile(r'(\d{3}\.?\d{3}\.?\d{3}[\-\.]?\d{2})')
+_CNPJ_RE = re.compile(r'(\d{2}\.?\d{3}\.?\d{3}[/\-]?\d{4}[\-\.]?\d{2})')
+_EMPRESA_PATS = [re.compile(p, _IM) for p in (
+    r'razão social[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{5,})',
+    r'nome fantasia[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{5,})',
+    r'empresa[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{5,})',
+    r'^([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{10,})\s*LTDA',
+    r'^([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{10,})\s*S\.?A\.?'
+)]
+_EMPRESA_LINE_RE = re.compile(r'^[A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]+$')
+_CEP_RE = re.compile(r'(\d{5}[\-\.]?\d{3})')
+# Quadra/lote/casa/apto/bloco/complemento numa única passada: o valor (até 20 caracteres)
+# termina antes do próximo rótulo, de pontuação ou do fim do texto
+_COMPLEMENTO_TAGS = r'quadra|qd|lote|lt|casa|apartamento|apto?|bloco|complemento'
+_COMPLEMENTO_RE = re.compile(
+    rf'\b({_COMPLEMENTO_TAGS})[:\s]+([A-Z0-9\s\-]{{1,20}}?)(?=\s*(?:\b(?:{_COMPLEMENTO_TAGS})\b|[^A-Z0-9\s\-]|$))', _I
+)
+
+@lru_cache(maxsize=8)
+def _encode_file_cached(key: Tuple[str, int, int, int, int]) -> str:
+    """
+    Base64 do arquivo, memorizado por (caminho, dispositivo, inode, mtime_ns, tamanho):
+    retentativas e documentos repetidos não recodificam a imagem
+    """
+    image_path, size = key[0], key[4]
+    if size == 0:
+        return ''
+    downscaled = _downscale_image(image_path)
+    if downscaled is not None:
+        return base64.b64encode(downscaled).decode('ascii')
+    with open(image_path, "rb") as image_file:
+        # mmap: o b64encode lê direto das páginas do arquivo, sem cópia intermediária em bytes
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return base64.b64encode(mapped).decode('ascii')
+
+def _downscale_image(image_path: str) -> Optional[bytes]:
+    """
+    JPEG reduzido (lado maior <= _MAX_IMAGE_DIM, qualidade 85) para imagens maiores que o limite;
+    None quando o arquivo original deve ser enviado como está (já pequeno, PDF, Pillow ausente)
+    """
+    if Image is None or _MAX_IMAGE_DIM <= 0:
+        return None
+    try:
+        with Image.open(image_path) as img:
+            if max(img.size) <= _MAX_IMAGE_DIM:
+                return None
+            # Aplica a orientação EXIF antes de descartar os metadados na recompressão
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((_MAX_IMAGE_DIM, _MAX_IMAGE_DIM), Image.LANCZOS)
+            buffer = BytesIO()
+            img.convert('RGB').save(buffer, 'JPEG', quality=85, optimize=True)
+            return buffer.getvalue()
+    except Exception as e:
+        logger.debug("Imagem %s enviada sem redução: %s", image_path, e)
+        return None
+
+# Valores que o modelo usa para "campo ausente"
+_EMPTY_VALUES = frozenset({'null', 'none', ''})
+_UNREADABLE_VALUES = frozenset({'[ILEGÍVEL]', '[REVISAR]', 'null'})
+
+# Critérios de qualidade focados nos campos essenciais
+_QUALITY_CHECKS = {
+    'rg': {
+        'required_fields': ['nome_completo', 'data_nascimento', 'cpf'],
+        'min_fields': 2  # Pelo menos 2 dos 3 campos
+    },
+    'cnpj': {
+        'required_fields': ['empresa', 'cnpj', 'nome_comprovante'],
+        'min_fields': 2  # Pelo menos 2 dos 3 campos
+    },
+    'address': {
+        'required_fields': ['cep', 'complemento'],
+        'min_fields': 1  # Pelo menos CEP
+    }
+}
+
+@dataclass(slots=True)
+class ConsolidatedCustomer:
+    """Registro consolidado do cliente (mesmas chaves do dict retornado pela consolidação)"""
+    # Dados da empresa
+    empresa: Optional[str] = None
+    cnpj: Optional[str] = None
+    inscricaoEstadual: Optional[str] = None
+    email: Optional[str] = None
+    telefone: Optional[str] = None
+    celular: Optional[str] = None
+    # Endereço
+    cep: Optional[str] = None
+    endereco: Optional[str] = None
+    numero: Optional[str] = None
+    complemento: Optional[str] = None
+    bairro: Optional[str] = None
+    cidade: Optional[str] = None
+    uf: Optional[str] = None
+    # Proprietário
+    nomeCompleto: Optional[str] = None
+    cpf: Optional[str] = None
+    dataNascimento: Optional[str] = None
+    enderecoProprietario: Optional[str] = None
+    # Metadados
+    confidenceScore: float = 0
+    fieldsExtracted: int = 0
+    fieldsTotal: int = 0
+    needsReview: List[str] = field(default_factory=list)
+
+def _successful_data(ocr_results: Dict, doc_type: str) -> Optional[Dict]:
+    """Dados extraídos de um documento processado com sucesso (None se ausente ou com falha)"""
+    entry = ocr_results.get(doc_type)
+    if not entry or not entry.get('success'):
+        return None
+    # 'parsed_data' no resultado do OCR; 'data' no resultado montado pela task Celery
+    return entry.get('parsed_data') or entry.get('data') or {}
+
+def _image_content(base64_image: str) -> Dict:
+    """Item de conteúdo com a imagem embutida como data URI"""
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:image/jpeg;base64,{base64_image}"
+        }
+    }
+
 class WalksBankOCR:
+    # Campos de dados do ConsolidatedCustomer, na ordem de declaração (base do cálculo de confiança)
+    _DATA_FIELDS = (
+        'empresa', 'cnpj', 'inscricaoEstadual', 'email', 'telefone', 'celular',
+        'cep', 'endereco', 'numero', 'complemento', 'bairro', 'cidade', 'uf',
+        'nomeCompleto', 'cpf', 'dataNascimento', 'enderecoProprietario'
+    )
+    _TOTAL_FIELDS = len(_DATA_FIELDS)
+
     def __init__(self, api_key: str = None, retry_config: OCRRetryConfig = None):
         """
         Inicializa o cliente OCR para Walks Bank
@@ -189,10 +347,40 @@ class WalksBankOCR:
         self.api_url = 'https://openrouter.ai/api/v1/chat/completions'
         self.model = "qwen/qwen2.5-vl-32b-instruct:free"
         self.retry_config = retry_config or OCRRetryConfig()
+        # Sessão HTTP reutilizada entre chamadas (criada sob demanda no event loop em uso)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
         
         if not self.api_key:
             raise ValueError("API Key é obrigatória. Configure OPENROUTER_API_KEY ou passe como parâmetro.")
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Retorna a sessão aiohttp, recriando-a se foi fechada ou pertence a outro event loop"""
+        loop = asyncio.get_running_loop()
+        session = self._session
+        if session is None or session.closed or self._session_loop is not loop:
+            if session is not None and not session.closed:
+                # Sessão de outro event loop: fechar antes de substituir para não vazar o conector
+                try:
+                    await session.close()
+                except RuntimeError:
+                    # Loop antigo já encerrado - o conector fica marcado como fechado mesmo assim
+                    pass
+            self._session_loop = loop
+            session = self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=30),
+                headers={'Authorization': f'Bearer {self.api_key}'}
+            )
+        return session
+    
+    async def aclose(self) -> None:
+        """Fecha a sessão HTTP"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+    
     def encode_image_to_base64(self, image_path: str) -> str:
         """
         Converte imagem para base64
@@ -204,10 +392,10 @@ class WalksBankOCR:
             String base64 da imagem
         """
         try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+            st = os.stat(image_path)
+            return _encode_file_cached((image_path, st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size))
         except Exception as e:
-            logger.error(f"Erro ao codificar imagem {image_path}: {str(e)}")
+            logger.error("Erro ao codificar imagem %s: %s", image_path, e)
             raise
     
     
@@ -282,7 +470,7 @@ class WalksBankOCR:
             Dicionário com os dados extraídos
         """
         try:
-            logger.info(f"Processando documento {document_type}: {image_path}")
+            logger.info("Processando documento %s: %s", document_type, image_path)
 
             # Se for fachada, apenas validar e retornar sem OCR
             if document_type == 'facade':
@@ -291,109 +479,118 @@ class WalksBankOCR:
                     'document_type': document_type,
                     'raw_text': None,
                     'parsed_data': {'stored_for_webhook': True, 'image_validated': True},
-                    'processed_at': datetime.now().isoformat(),
+                    'processed_at': _now_iso(),
                     'note': 'Fachada armazenada para webhook - não processada por OCR'
                 }
             
-            # Codificar imagem
-            base64_image = self.encode_image_to_base64(image_path)
-            
-            # Preparar payload
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": self.get_document_prompt(document_type)
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                "max_tokens": 1000,
-                "temperature": 0.1  # Baixa temperatura para maior precisão
-            }
-            
-            # Fazer chamada para API
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.api_key}'
-            }
-            
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Erro na API: {response.status_code} - {response.text}")
-                raise Exception(f"Erro na API OCR: {response.status_code}")
-            
-            result = response.json()
-            extracted_text = result['choices'][0]['message']['content']
-            
-            logger.debug(f"=== RESPOSTA BRUTA DA API PARA {document_type.upper()} ===")
-            logger.debug(f"Texto completo recebido: {extracted_text}")
-            logger.debug(f"Tamanho da resposta: {len(extracted_text)} caracteres")
-            logger.debug("=" * 60)
-            
-            logger.info(f"Documento {document_type} processado com sucesso")
-            
-            # Validar resultado antes de retornar
-            raw_result = {
-                'success': True,
-                'document_type': document_type,
-                'raw_text': extracted_text,
-                'parsed_data': self.parse_extracted_data(extracted_text, document_type),
-                'processed_at': datetime.now().isoformat()
-            }
-
-            validated_result = self.validate_ocr_result(raw_result, document_type)
-            logger.info(f"Documento {document_type} processado - Qualidade: {validated_result.get('quality_metrics', {}).get('score', 0):.1f}%")
+            # Codificar imagem (redução + base64, CPU) fora da thread do event loop
+            base64_image = await asyncio.to_thread(self.encode_image_to_base64, image_path)
+            
+            # Fazer chamada para API (não bloqueia o event loop)
+            extracted_text = await self._request_completion([
+                {
+                    "type": "text",
+                    "text": self.get_document_prompt(document_type)
+                },
+                _image_content(base64_image)
+            ])
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("=== RESPOSTA BRUTA DA API PARA %s ===", document_type.upper())
+                logger.debug("Texto completo recebido: %s", extracted_text)
+                logger.debug("Tamanho da resposta: %d caracteres", len(extracted_text))
+                logger.debug("=" * 60)
+            
+            logger.info("Documento %s processado com sucesso", document_type)
+            
+            # Parse e validação (regex, CPU) fora da thread do event loop
+            validated_result = await asyncio.to_thread(self._parse_and_validate, extracted_text, document_type)
+            logger.info("Documento %s processado - Qualidade: %.1f%%", document_type, validated_result.get('quality_metrics', {}).get('score', 0))
 
             return validated_result
             
         except Exception as e:
-            logger.error(f"Erro ao processar documento {document_type}: {str(e)}")
-            return {
+            logger.error("Erro ao processar documento %s: %s", document_type, e)
+            result = {
                 'success': False,
                 'document_type': document_type,
                 'error': str(e),
-                'processed_at': datetime.now().isoformat()
+                'processed_at': _now_iso()
             }
+            if isinstance(e, OCRAPIError):
+                # Classificação repassada ao retry_ocr
+                result['status_code'] = e.status
+                result['retryable'] = e.retryable
+            return result
     
     
+    async def _request_completion(self, content: List[Dict], max_tokens: int = 1000) -> str:
+        """
+        Envia uma mensagem (texto + imagens) ao modelo e retorna o texto da resposta
+        
+        Args:
+            content: Itens de conteúdo da mensagem do usuário
+            max_tokens: Limite de tokens da resposta
+            
+        Returns:
+            Texto retornado pelo modelo
+        """
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": content
+                }
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.1  # Baixa temperatura para maior precisão
+        }
+        
+        session = await self._get_session()
+        try:
+            async with session.post(self.api_url, json=payload) as response:
+                if response.status != 200:
+                    logger.error("Erro na API: %s - %s", response.status, await response.text())
+                    raise OCRAPIError(f"Erro na API OCR: {response.status}", response.status)
+                # Parse direto dos bytes do corpo (orjson quando disponível)
+                result = _json_loads(await response.read())
+        except asyncio.TimeoutError:
+            raise OCRAPIError("Timeout na chamada da API OCR")
+        except aiohttp.ClientError as e:
+            raise OCRAPIError(f"Erro de conexão com a API OCR: {e}")
+        
+        return result['choices'][0]['message']['content']
+    
+    def _parse_and_validate(self, extracted_text: str, document_type: str) -> Dict:
+        """Monta o resultado a partir do texto extraído e valida antes de retornar"""
+        raw_result = {
+            'success': True,
+            'document_type': document_type,
+            'raw_text': extracted_text,
+            'parsed_data': self.parse_extracted_data(extracted_text, document_type),
+            'processed_at': _now_iso()
+        }
+        return self.validate_ocr_result(raw_result, document_type)
+    
     def parse_extracted_data(self, raw_text: str, document_type: str) -> Dict:
         """
         Parser focado que extrai apenas os campos essenciais usando múltiplas estratégias
         """
         try:
-            logger.debug(f"Iniciando parse focado para {document_type}")
+            logger.debug("Iniciando parse focado para %s", document_type)
             
-            # Estratégia 1: Tentar extrair JSON limpo
-            json_result = self._extract_json_from_text(raw_text)
-            if json_result:
-                logger.debug(f"JSON extraído com sucesso para {document_type}")
-                return self._validate_essential_fields(json_result, document_type)
+            # Estratégia 1: JSON limpo; estratégia 2 (só se não houver JSON): regex focado nos campos essenciais
+            data = self._extract_json_from_text(raw_text)
+            if not data:
+                logger.debug("JSON não encontrado, usando parser regex para %s", document_type)
+                data = self._extract_with_focused_regex(raw_text, document_type)
             
-            # Estratégia 2: Parser por regex focado nos campos essenciais
-            logger.debug(f"JSON não encontrado, usando parser regex para {document_type}")
-            regex_result = self._extract_with_focused_regex(raw_text, document_type)
-            
-            return self._validate_essential_fields(regex_result, document_type)
+            # Limpeza dos campos num único ponto de saída
+            return self._validate_essential_fields(data or {}, document_type)
             
         except Exception as e:
-            logger.error(f"Erro no parse de dados para {document_type}: {e}")
+            logger.error("Erro no parse de dados para %s: %s", document_type, e)
             return {'error': f'Erro no parse: {str(e)}'}
 
     def _extract_json_from_text(self, text: str) -> Optional[Dict]:
@@ -401,27 +598,20 @@ class WalksBankOCR:
         try:
             # Tentativa 1: JSON direto
             if text.strip().startswith('{') and text.strip().endswith('}'):
-                return json.loads(text.strip())
+                return _json_loads(text.strip())
             
             # Tentativa 2: JSON dentro de blocos de código
-            json_patterns = [
-                r'\`\`\`json\s*(\{.*?\})\s*\`\`\`',
-                r'\`\`\`\s*(\{.*?\})\s*\`\`\`',
-                r'(\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\})'
-            ]
-            
-            for pattern in json_patterns:
-                matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
-                for match in matches:
+            for pattern in _JSON_PATS:
+                for match in pattern.findall(text):
                     try:
-                        return json.loads(match.strip())
+                        return _json_loads(match.strip())
                     except:
                         continue
             
             return None
             
         except Exception as e:
-            logger.debug(f"Erro na extração JSON: {e}")
+            logger.debug("Erro na extração JSON: %s", e)
             return None
 
     def _extract_with_focused_regex(self, text: str, document_type: str) -> Dict:
@@ -445,14 +635,8 @@ class WalksBankOCR:
         }
         
         # Nome completo - buscar padrões comuns
-        nome_patterns = [
-            r'nome[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s]{10,})',
-            r'nome completo[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s]{10,})',
-            r'^([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s]{15,})$'  # Linha com nome longo
-        ]
-        
-        for pattern in nome_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in _RG_NOME_PATS:
+            match = pattern.search(text)
             if match:
                 nome = match.group(1).strip()
                 if len(nome.split()) >= 2:  # Pelo menos nome e sobrenome
@@ -460,33 +644,14 @@ class WalksBankOCR:
                     break
         
         # Data de nascimento
-        data_patterns = [
-            r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{4})',
-            r'nascimento[:\s]+(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{4})',
-            r'data[:\s]+(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{4})'
-        ]
-        
-        for pattern in data_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                result["data_nascimento"] = match.group(1)
-                break
-        
-        # CPF
-        cpf_patterns = [
-            r'(\d{3}\.?\d{3}\.?\d{3}[\-\.]?\d{2})',
-            r'cpf[:\s]+(\d{3}\.?\d{3}\.?\d{3}[\-\.]?\d{2})'
-        ]
+        match = _DATA_RE.search(text)
+        if match:
+            result["data_nascimento"] = match.group(1)
         
-        for pattern in cpf_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                cpf = match.group(1)
-                # Validar se tem 11 dígitos
-                cpf_digits = re.sub(r'[^\d]', '', cpf)
-                if len(cpf_digits) == 11:
-                    result["cpf"] = cpf
-                    break
+        # CPF (o padrão exige exatamente 11 dígitos)
+        match = _CPF_RE.search(text)
+        if match:
+            result["cpf"] = match.group(1)
         
         return result
 
@@ -498,33 +663,14 @@ class WalksBankOCR:
             "nome_comprovante": None
         }
         
-        # CNPJ
-        cnpj_patterns = [
-            r'(\d{2}\.?\d{3}\.?\d{3}[/\-]?\d{4}[\-\.]?\d{2})',
-            r'cnpj[:\s]+(\d{2}\.?\d{3}\.?\d{3}[/\-]?\d{4}[\-\.]?\d{2})'
-        ]
-        
-        for pattern in cnpj_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                cnpj = match.group(1)
-                # Validar se tem 14 dígitos
-                cnpj_digits = re.sub(r'[^\d]', '', cnpj)
-                if len(cnpj_digits) == 14:
-                    result["cnpj"] = cnpj
-                    break
+        # CNPJ (o padrão exige exatamente 14 dígitos)
+        match = _CNPJ_RE.search(text)
+        if match:
+            result["cnpj"] = match.group(1)
         
         # Empresa/Razão Social/Nome Fantasia
-        empresa_patterns = [
-            r'razão social[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{5,})',
-            r'nome fantasia[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{5,})',
-            r'empresa[:\s]+([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{5,})',
-            r'^([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{10,})\s*LTDA',
-            r'^([A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]{10,})\s*S\.?A\.?'
-        ]
-        
-        for pattern in empresa_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in _EMPRESA_PATS:
+            match = pattern.search(text)
             if match:
                 empresa = match.group(1).strip()
                 if len(empresa) >= 5:
@@ -541,7 +687,7 @@ class WalksBankOCR:
             for line in lines:
                 line = line.strip()
                 if (len(line) >= 10 and 
-                    re.match(r'^[A-ZÁÀÂÃÉÊÍÓÔÕÚÇ\s\-\.]+$', line) and
+                    _EMPRESA_LINE_RE.match(line) and
                     any(word in line.upper() for word in ['LTDA', 'S.A', 'EIRELI', 'ME', 'EPP'])):
                     result["nome_comprovante"] = line
                     break
@@ -555,45 +701,16 @@ class WalksBankOCR:
             "complemento": None
         }
         
-        # CEP
-        cep_patterns = [
-            r'(\d{5}[\-\.]?\d{3})',
-            r'cep[:\s]+(\d{5}[\-\.]?\d{3})'
-        ]
-        
-        for pattern in cep_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                cep = match.group(1)
-                # Validar se tem 8 dígitos
-                cep_digits = re.sub(r'[^\d]', '', cep)
-                if len(cep_digits) == 8:
-                    result["cep"] = cep
-                    break
+        # CEP (o padrão exige exatamente 8 dígitos)
+        match = _CEP_RE.search(text)
+        if match:
+            result["cep"] = match.group(1)
         
         # Complemento - buscar informações adicionais
-        complemento_patterns = [
-            r'quadra[:\s]+([A-Z0-9\s\-]+)',
-            r'qd[:\s]+([A-Z0-9\s\-]+)',
-            r'lote[:\s]+([A-Z0-9\s\-]+)',
-            r'lt[:\s]+([A-Z0-9\s\-]+)',
-            r'casa[:\s]+([A-Z0-9\s\-]+)',
-            r'apartamento[:\s]+([A-Z0-9\s\-]+)',
-            r'apto?[:\s]+([A-Z0-9\s\-]+)',
-            r'bloco[:\s]+([A-Z0-9\s\-]+)',
-            r'complemento[:\s]+([A-Z0-9\s\-]+)'
-        ]
-        
-        complementos = []
-        for pattern in complemento_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                comp = match.strip()
-                if comp and len(comp) <= 20:  # Evitar textos muito longos
-                    complementos.append(comp)
-        
+        # dict.fromkeys remove duplicatas mantendo a ordem de aparição (saída determinística)
+        complementos = dict.fromkeys(value for value in (m.group(2).strip() for m in _COMPLEMENTO_RE.finditer(text)) if value)
         if complementos:
-            result["complemento"] = ", ".join(set(complementos))  # Remove duplicatas
+            result["complemento"] = ", ".join(complementos)
         
         return result
 
@@ -601,14 +718,12 @@ class WalksBankOCR:
         """Valida se os campos essenciais foram extraídos"""
         
         # Limpar valores vazios ou inválidos
-        cleaned_data = {}
-        for key, value in data.items():
-            if value and str(value).strip() and str(value).strip().lower() not in ['null', 'none', '']:
-                cleaned_data[key] = str(value).strip()
-            else:
-                cleaned_data[key] = None
+        cleaned_data = {
+            key: (text if value and (text := str(value).strip()) and text.lower() not in _EMPTY_VALUES else None)
+            for key, value in data.items()
+        }
         
-        logger.debug(f"Dados limpos para {document_type}: {cleaned_data}")
+        logger.debug("Dados limpos para %s: %s", document_type, cleaned_data)
         return cleaned_data
     
     async def process_all_documents(self, documents: Dict[str, str]) -> Dict:
@@ -623,20 +738,39 @@ class WalksBankOCR:
             Dicionário com todos os dados processados
         """
         results = {}
+        # Limite de chamadas simultâneas para respeitar o rate limit da OpenRouter
+        semaphore = asyncio.Semaphore(self.retry_config.max_concurrent or 5)
+        
+        async def process_limited(image_path: str, doc_type: str) -> Dict:
+            async with semaphore:
+                return await self.process_document(image_path, doc_type)
         
+        tasks = {}
         for doc_type, image_path in documents.items():
             if image_path and os.path.exists(image_path):
-                result = await self.process_document(image_path, doc_type)
-                results[doc_type] = result
+                tasks[doc_type] = asyncio.create_task(process_limited(image_path, doc_type))
             else:
-                logger.warning(f"Documento {doc_type} não encontrado: {image_path}")
+                logger.warning("Documento %s não encontrado: %s", doc_type, image_path)
                 results[doc_type] = {
                     'success': False,
                     'error': 'Arquivo não encontrado',
                     'document_type': doc_type
                 }
         
-        return results
+        # Latência total = a do documento mais lento, não a soma de todos
+        results_list = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for doc_type, result in zip(tasks, results_list):
+            if isinstance(result, BaseException):
+                logger.error("Erro ao processar documento %s: %s", doc_type, result)
+                result = {
+                    'success': False,
+                    'error': str(result),
+                    'document_type': doc_type
+                }
+            results[doc_type] = result
+        
+        # Mantém a ordem de entrada dos documentos
+        return {doc_type: results[doc_type] for doc_type in documents}
     
     def consolidate_customer_data(self, ocr_results: Dict) -> Dict:
         """
@@ -648,93 +782,56 @@ class WalksBankOCR:
         Returns:
             Dados consolidados do cliente
         """
-        consolidated = {
-            # Dados da empresa
-            'empresa': None,
-            'cnpj': None,
-            'inscricaoEstadual': None,
-            'email': None,
-            'telefone': None,
-            'celular': None,
-            
-            # Endereço
-            'cep': None,
-            'endereco': None,
-            'numero': None,
-            'complemento': None,
-            'bairro': None,
-            'cidade': None,
-            'uf': None,
-            
-            # Proprietário
-            'nomeCompleto': None,
-            'cpf': None,
-            'dataNascimento': None,
-            'enderecoProprietario': None,
-            
-            # Metadados
-            'confidenceScore': 0,
-            'fieldsExtracted': 0,
-            'fieldsTotal': 0,
-            'needsReview': []
-        }
+        consolidated = ConsolidatedCustomer()
         
         # Processar dados do CNPJ
-        if 'cnpj' in ocr_results and ocr_results['cnpj']['success']:
-            cnpj_data = ocr_results['cnpj']['parsed_data']
-            consolidated.update({
-                'empresa': cnpj_data.get('razao_social') or cnpj_data.get('nome_fantasia'),
-                'cnpj': cnpj_data.get('cnpj'),
-                'inscricaoEstadual': cnpj_data.get('inscricao_estadual'),
-                'email': cnpj_data.get('email'),
-                'telefone': cnpj_data.get('telefone'),
-                'endereco': cnpj_data.get('endereco'),
-                'numero': cnpj_data.get('numero'),
-                'complemento': cnpj_data.get('complemento'),
-                'bairro': cnpj_data.get('bairro'),
-                'cidade': cnpj_data.get('cidade'),
-                'uf': cnpj_data.get('uf'),
-                'cep': cnpj_data.get('cep')
-            })
+        cnpj_data = _successful_data(ocr_results, 'cnpj')
+        if cnpj_data is not None:
+            consolidated.empresa = cnpj_data.get('razao_social') or cnpj_data.get('nome_fantasia')
+            consolidated.cnpj = cnpj_data.get('cnpj')
+            consolidated.inscricaoEstadual = cnpj_data.get('inscricao_estadual')
+            consolidated.email = cnpj_data.get('email')
+            consolidated.telefone = cnpj_data.get('telefone')
+            consolidated.endereco = cnpj_data.get('endereco')
+            consolidated.numero = cnpj_data.get('numero')
+            consolidated.complemento = cnpj_data.get('complemento')
+            consolidated.bairro = cnpj_data.get('bairro')
+            consolidated.cidade = cnpj_data.get('cidade')
+            consolidated.uf = cnpj_data.get('uf')
+            consolidated.cep = cnpj_data.get('cep')
         
         # Processar dados do RG
-        if 'rg' in ocr_results and ocr_results['rg']['success']:
-            rg_data = ocr_results['rg']['parsed_data']
-            consolidated.update({
-                'nomeCompleto': rg_data.get('nome_completo'),
-                'cpf': rg_data.get('cpf'),
-                'dataNascimento': rg_data.get('data_nascimento')
-            })
+        rg_data = _successful_data(ocr_results, 'rg')
+        if rg_data is not None:
+            consolidated.nomeCompleto = rg_data.get('nome_completo')
+            consolidated.cpf = rg_data.get('cpf')
+            consolidated.dataNascimento = rg_data.get('data_nascimento')
         
         # Processar comprovante de endereço (complementar/validar endereço)
-        if 'address' in ocr_results and ocr_results['address']['success']:
-            addr_data = ocr_results['address']['parsed_data']
-            # Usar dados do comprovante se não tiver do CNPJ
-            if not consolidated['endereco']:
-                consolidated.update({
-                    'endereco': addr_data.get('endereco'),
-                    'numero': addr_data.get('numero'),
-                    'complemento': addr_data.get('complemento'),
-                    'bairro': addr_data.get('bairro'),
-                    'cidade': addr_data.get('cidade'),
-                    'uf': addr_data.get('uf'),
-                    'cep': addr_data.get('cep')
-                })
+        addr_data = _successful_data(ocr_results, 'address')
+        # Usar dados do comprovante se não tiver do CNPJ
+        if addr_data is not None and not consolidated.endereco:
+            consolidated.endereco = addr_data.get('endereco')
+            consolidated.numero = addr_data.get('numero')
+            consolidated.complemento = addr_data.get('complemento')
+            consolidated.bairro = addr_data.get('bairro')
+            consolidated.cidade = addr_data.get('cidade')
+            consolidated.uf = addr_data.get('uf')
+            consolidated.cep = addr_data.get('cep')
         
         # Calcular métricas de confiança
-        total_fields = len([k for k in consolidated.keys() if not k.startswith('confidence') and not k.startswith('fields') and k != 'needsReview'])
-        filled_fields = len([v for v in consolidated.values() if v is not None and v != '' and not str(v).startswith('[') ])
+        values = [getattr(consolidated, k) for k in self._DATA_FIELDS]
+        filled_fields = sum(1 for v in values if v and not str(v).startswith('['))
         
-        consolidated['fieldsTotal'] = total_fields
-        consolidated['fieldsExtracted'] = filled_fields
-        consolidated['confidenceScore'] = (filled_fields / total_fields) * 100 if total_fields > 0 else 0
+        consolidated.fieldsTotal = self._TOTAL_FIELDS
+        consolidated.fieldsExtracted = filled_fields
+        consolidated.confidenceScore = (filled_fields / self._TOTAL_FIELDS) * 100
         
         # Identificar campos que precisam revisão
-        for key, value in consolidated.items():
-            if value and '[REVISAR]' in str(value):
-                consolidated['needsReview'].append(key)
+        consolidated.needsReview = [k for k, v in zip(self._DATA_FIELDS, values) if v and '[REVISAR]' in str(v)]
         
-        return consolidated
+        # Conversão para dict apenas na saída (resultado da task é serializado)
+        return asdict(consolidated)
 
     
     def validate_ocr_result(self, result: Dict, document_type: str) -> Dict:
@@ -744,41 +841,28 @@ class WalksBankOCR:
         if not result.get('success', False):
             return result
         
-        parsed_data = result.get('parsed_data', {})
-        
-        # Critérios de qualidade focados nos campos essenciais
-        quality_checks = {
-            'rg': {
-                'required_fields': ['nome_completo', 'data_nascimento', 'cpf'],
-                'min_fields': 2  # Pelo menos 2 dos 3 campos
-            },
-            'cnpj': {
-                'required_fields': ['empresa', 'cnpj', 'nome_comprovante'],
-                'min_fields': 2  # Pelo menos 2 dos 3 campos
-            },
-            'address': {
-                'required_fields': ['cep', 'complemento'],
-                'min_fields': 1  # Pelo menos CEP
-            }
-        }
-        
-        if document_type not in quality_checks:
+        checks = _QUALITY_CHECKS.get(document_type)
+        if checks is None:
             return result
         
-        checks = quality_checks[document_type]
+        parsed_data = result.get('parsed_data') or {}
         
         # Contar campos válidos
         valid_fields = 0
-        missing_required = []
         found_fields = []
         
-        for field in checks['required_fields']:
-            value = parsed_data.get(field)
-            if value and str(value).strip() and str(value) not in ['[ILEGÍVEL]', '[REVISAR]', 'null']:
-                valid_fields += 1
-                found_fields.append(field)
-            else:
-                missing_required.append(field)
+        if any(parsed_data.values()):
+            missing_required = []
+            for field in checks['required_fields']:
+                value = parsed_data.get(field)
+                if value and str(value).strip() and str(value) not in _UNREADABLE_VALUES:
+                    valid_fields += 1
+                    found_fields.append(field)
+                else:
+                    missing_required.append(field)
+        else:
+            # Nada extraído (caminho de falha comum): todos os campos faltando, sem percorrer um a um
+            missing_required = list(checks['required_fields'])
         
         # Calcular score de qualidade
         quality_score = (valid_fields / len(checks['required_fields'])) * 100
@@ -787,9 +871,9 @@ class WalksBankOCR:
         is_acceptable = valid_fields >= checks['min_fields']
         
         # Log detalhado dos resultados
-        logger.info(f"Validação {document_type}: {valid_fields}/{len(checks['required_fields'])} campos encontrados")
-        logger.info(f"Campos encontrados: {found_fields}")
-        logger.info(f"Campos faltando: {missing_required}")
+        logger.info("Validação %s: %d/%d campos encontrados", document_type, valid_fields, len(checks['required_fields']))
+        logger.info("Campos encontrados: %s", found_fields)
+        logger.info("Campos faltando: %s", missing_required)
         
         # Adicionar metadados de qualidade
         result['quality_metrics'] = {
@@ -807,8 +891,8 @@ class WalksBankOCR:
             result['success'] = False
             result['error'] = f'Apenas {valid_fields}/{len(checks["required_fields"])} campos essenciais extraídos. Mínimo: {checks["min_fields"]}'
             result['retry_reason'] = 'insufficient_essential_fields'
-            logger.warning(f"Documento {document_type} rejeitado: qualidade insuficiente")
+            logger.warning("Documento %s rejeitado: qualidade insuficiente", document_type)
         else:
-            logger.info(f"Documento {document_type} aprovado: qualidade suficiente ({quality_score:.1f}%)")
+            logger.info("Documento %s aprovado: qualidade suficiente (%.1f%%)", document_type, quality_score)
         
         return result
@@ -0,0 +1,23 @@
+"""
+Serializers de resultado compartilhados entre os workers Celery e a API
+"""
+
+from kombu.serialization import register
+
+# orjson é opcional - sem ele os resultados continuam em msgpack
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def register_orjson_serializer() -> bool:
+    """Registra o serializer 'orjson' no kombu; retorna False se o orjson não estiver instalado"""
+    if orjson is None:
+        return False
+    register('orjson', orjson.dumps, orjson.loads,
+             content_type='application/x-orjson', content_encoding='utf-8')
+    return True
+
+# Resultados são JSON puro (sem bytes): orjson serializa mais rápido; tarefas seguem em msgpack
+RESULT_SERIALIZER = 'orjson' if register_orjson_serializer() else 'msgpack'
+ACCEPT_CONTENT = ['msgpack', 'orjson', 'json'] if RESULT_SERIALIZER == 'orjson' else ['msgpack', 'json']
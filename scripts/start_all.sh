@@ -215,6 +215,8 @@ fi
 
 # 6. INICIAR CELERY WORKER
 log_info "Iniciando Celery Worker..."
+# Flower (passo seguinte) depende dos eventos de task emitidos pelo worker
+export CELERY_MONITORING=${CELERY_MONITORING:-1}
 python3 scripts/start_celery_worker.py > logs/celery_worker.log 2>&1 &
 WORKER_PID=$!
 
@@ -6,8 +6,10 @@ Script para iniciar o worker Celery com verificações robustas
 import os
 import sys
 import time
+import random
 import redis
 import logging
+from types import SimpleNamespace
 from celery_app import celery_app
 
 # Configurar logging
@@ -17,34 +19,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def check_redis_connection(max_retries=5, retry_delay=2):
+# Variáveis obrigatórias e quais delas são mascaradas nos logs
+_REQUIRED_VARS = {
+    'OPENROUTER_API_KEY': 'Chave da API OpenRouter para OCR',
+    'REDIS_URL': 'URL de conexão com Redis'
+}
+_SENSITIVE_VARS = frozenset({'OPENROUTER_API_KEY'})
+
+# Ambiente lido uma única vez (após o load_dotenv de celery_app)
+CONFIG = SimpleNamespace(**{var: os.environ.get(var) for var in _REQUIRED_VARS})
+
+# Pool único e limitado de conexões Redis, reaproveitado entre tentativas
+_REDIS_POOL = redis.BlockingConnectionPool.from_url(
+    CONFIG.REDIS_URL or 'redis://localhost:6379/0',
+    max_connections=int(os.getenv('REDIS_POOL_MAX', '16')),
+    socket_timeout=5,
+    socket_connect_timeout=5,
+    socket_keepalive=True,
+    retry_on_timeout=True,
+    health_check_interval=30,
+)
+
+# Pools de I/O (green threads/threads) aguentam muito mais tarefas simultâneas por núcleo
+_IO_POOLS = frozenset({'gevent', 'eventlet', 'threads'})
+
+def default_concurrency(pool):
+    """Concorrência padrão inferida do número de CPUs para o pool escolhido"""
+    cpus = os.cpu_count() or 1
+    return cpus * 10 if pool in _IO_POOLS else cpus
+
+def check_redis_connection(max_retries=5, retry_delay=2, max_delay=30):
     """
     Verifica conexão com Redis com retry automático
     
+    Backoff exponencial com jitter total: workers reiniciados juntos não
+    reconectam em sincronia.
+    
     Args:
         max_retries: Número máximo de tentativas
-        retry_delay: Delay entre tentativas em segundos
+        retry_delay: Delay base entre tentativas em segundos
+        max_delay: Teto do delay entre tentativas em segundos
         
     Returns:
         bool: True se conectou com sucesso
     """
-    redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    redis_client = redis.Redis(connection_pool=_REDIS_POOL)
     
     for attempt in range(max_retries):
         try:
             logger.info(f"Tentativa {attempt + 1}/{max_retries} - Conectando ao Redis...")
             
-            # Criar cliente Redis
-            redis_client = redis.from_url(redis_url, socket_timeout=5, socket_connect_timeout=5)
-            
-            # Testar conexão
-            redis_client.ping()
-            
-            # Testar operações básicas
+            # Testar conexão e operações básicas em um único round-trip
             test_key = "celery_worker_test"
-            redis_client.set(test_key, "test_value", ex=10)
-            value = redis_client.get(test_key)
-            redis_client.delete(test_key)
+            with redis_client.pipeline(transaction=False) as pipe:
+                pipe.ping()
+                pipe.set(test_key, "test_value", ex=10)
+                pipe.get(test_key)
+                pipe.delete(test_key)
+                value = pipe.execute()[2]
             
             if value == b"test_value":
                 logger.info("✅ Conexão com Redis estabelecida e testada com sucesso")
@@ -60,26 +92,21 @@ def check_redis_connection(max_retries=5, retry_delay=2):
             logger.warning(f"❌ Erro inesperado Redis (tentativa {attempt + 1}): {e}")
         
         if attempt < max_retries - 1:
-            logger.info(f"⏳ Aguardando {retry_delay}s antes da próxima tentativa...")
-            time.sleep(retry_delay)
-            retry_delay *= 1.5  # Backoff exponencial
+            delay = random.uniform(0, min(max_delay, retry_delay * 2 ** attempt))
+            logger.info(f"⏳ Aguardando {delay:.1f}s antes da próxima tentativa...")
+            time.sleep(delay)
     
     return False
 
 def check_celery_broker():
-    """Verifica se o Celery consegue se conectar ao broker"""
+    """Verifica se o broker do Celery (Redis) responde"""
     try:
         logger.info("🔍 Verificando conexão Celery com broker...")
         
-        # Tentar ping no Celery
-        ping_result = celery_app.control.ping(timeout=10)
-        
-        if ping_result:
-            logger.info("✅ Celery conectado ao broker com sucesso")
-            return True
-        else:
-            logger.warning("⚠️  Nenhum worker Celery respondeu ao ping")
-            return True  # Ainda pode iniciar o primeiro worker
+        # PING direto no pool compartilhado: sem fila de resposta nem espera por broadcast
+        redis.Redis(connection_pool=_REDIS_POOL).ping()
+        logger.info("✅ Celery conectado ao broker com sucesso")
+        return True
             
     except Exception as e:
         logger.error(f"❌ Erro na conexão Celery: {e}")
@@ -89,25 +116,19 @@ def validate_environment():
     """Valida variáveis de ambiente essenciais"""
     logger.info("🔧 Validando variáveis de ambiente...")
     
-    required_vars = {
-        'OPENROUTER_API_KEY': 'Chave da API OpenRouter para OCR',
-        'REDIS_URL': 'URL de conexão com Redis'
-    }
-    
     missing_vars = []
     
-    for var, description in required_vars.items():
-        value = os.getenv(var)
+    for var, description in _REQUIRED_VARS.items():
+        value = getattr(CONFIG, var)
         if not value:
             missing_vars.append(f"  - {var}: {description}")
             logger.error(f"❌ {var} não configurada")
-        else:
+        elif var in _SENSITIVE_VARS:
             # Mascarar valores sensíveis nos logs
-            if 'KEY' in var or 'PASSWORD' in var:
-                masked_value = f"{value[:8]}..." if len(value) > 8 else "***"
-                logger.info(f"✅ {var}: {masked_value}")
-            else:
-                logger.info(f"✅ {var}: {value}")
+            masked_value = f"{value[:8]}..." if len(value) > 8 else "***"
+            logger.info(f"✅ {var}: {masked_value}")
+        else:
+            logger.info(f"✅ {var}: {value}")
     
     if missing_vars:
         logger.error("❌ Variáveis de ambiente obrigatórias não configuradas:")
@@ -146,12 +167,21 @@ def main():
         sys.exit(1)
     
     # 4. Configurações do worker
+    # prefork é o padrão: as tarefas OCR usam um event loop asyncio por processo
+    pool = os.getenv('CELERY_POOL', 'prefork')
     worker_config = {
-        'concurrency': int(os.getenv('CELERY_CONCURRENCY', '2')),
-        'max_tasks_per_child': int(os.getenv('CELERY_MAX_TASKS_PER_CHILD', '10')),
+        'pool': pool,
+        'concurrency': int(os.getenv('CELERY_CONCURRENCY') or default_concurrency(pool)),
+        'max_tasks_per_child': int(os.getenv('CELERY_MAX_TASKS_PER_CHILD', '10000')),
+        'max_memory_per_child': celery_app.conf.worker_max_memory_per_child,
         'loglevel': os.getenv('CELERY_LOG_LEVEL', 'info'),
         'queues': os.getenv('CELERY_QUEUES', 'ocr_queue'),
     }
+    # OCR é longo: prefetch 1 evita reter tarefas; filas curtas se beneficiam de prefetch alto
+    default_prefetch = '1' if 'ocr_queue' in worker_config['queues'].split(',') else '16'
+    worker_config['prefetch_multiplier'] = int(os.getenv('CELERY_PREFETCH_MULTIPLIER', default_prefetch))
+    # Uma conexão de broker por slot de concorrência, mais folga para controle/eventos
+    celery_app.conf.broker_pool_limit = worker_config['concurrency'] + 2
     
     logger.info("🚀 Configuração do Worker:")
     for key, value in worker_config.items():
@@ -163,6 +193,7 @@ def main():
     logger.info("     - process_documents_task")
     logger.info("     - process_single_document_task")
     logger.info("     - cleanup_old_results")
+    logger.info(f"   Validade dos resultados: {celery_app.conf.result_expires}s")
     
     logger.info("\n" + "=" * 60)
     logger.info("✅ Worker pronto! Pressione Ctrl+C para parar")
@@ -174,8 +205,11 @@ def main():
             'worker',
             f'--loglevel={worker_config["loglevel"]}',
             f'--queues={worker_config["queues"]}',
+            f'--pool={worker_config["pool"]}',
             f'--concurrency={worker_config["concurrency"]}',
             f'--max-tasks-per-child={worker_config["max_tasks_per_child"]}',
+            f'--max-memory-per-child={worker_config["max_memory_per_child"]}',
+            f'--prefetch-multiplier={worker_config["prefetch_multiplier"]}',
             '--without-gossip',  # Reduz overhead de rede
             '--without-mingle',  # Reduz tempo de startup
             '--without-heartbeat',  # Para desenvolvimento
@@ -5,6 +5,7 @@ Script para iniciar o Flower (monitoramento Celery)
 
 import os
 import sys
+import redis
 from celery_app import celery_app
 
 def main():
@@ -12,12 +13,17 @@ def main():
     print("🌸 Iniciando Flower - Monitor Celery")
     print("=" * 40)
     
-    # Verificar Redis
+    # Verificar Redis (PING direto, com timeout curto)
     try:
-        ping_result = celery_app.control.ping()
-        if not ping_result:
+        redis_client = redis.Redis.from_url(
+            os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            socket_timeout=3,
+            socket_connect_timeout=3
+        )
+        if not redis_client.ping():
             print("❌ Redis não está respondendo")
             sys.exit(1)
+        redis_client.close()
         print("✅ Conexão com Redis OK")
     except Exception as e:
         print(f"❌ Erro ao conectar com Redis: {e}")
@@ -126,19 +126,38 @@ fi
 
 log_success "API iniciada (PID: $API_PID)"
 
+# Flower depende dos eventos de task emitidos pelos workers
+if [ "${ENABLE_FLOWER:-true}" = "true" ]; then
+    export CELERY_MONITORING=${CELERY_MONITORING:-1}
+fi
+
 # Iniciar Workers Celery
+# OCR (tarefas longas): prefetch 1 para não reter tarefas num worker ocupado
 log_info "Iniciando Celery Workers..."
 for i in $(seq 1 ${CELERY_WORKERS:-2}); do
     celery -A celery_app worker \
            --loglevel=info \
            --queues=ocr_queue \
            --concurrency=${CELERY_CONCURRENCY:-2} \
-           --max-tasks-per-child=${CELERY_MAX_TASKS_PER_CHILD:-10} \
+           --prefetch-multiplier=1 \
+           --max-tasks-per-child=${CELERY_MAX_TASKS_PER_CHILD:-10000} \
+           --max-memory-per-child=${CELERY_MAX_MEMORY_PER_CHILD:-512000} \
            --logfile=logs/worker_$i.log \
            --pidfile=logs/worker_$i.pid \
            --detach
 done
 
+# Tarefas curtas (webhook, manutenção, áudio): prefetch alto evita um RTT ao Redis por tarefa
+celery -A celery_app worker \
+       --loglevel=info \
+       --queues=webhook_queue,maintenance_queue,audio_queue \
+       --concurrency=${CELERY_FAST_CONCURRENCY:-4} \
+       --prefetch-multiplier=${CELERY_FAST_PREFETCH:-16} \
+       --hostname=fast@%h \
+       --logfile=logs/worker_fast.log \
+       --pidfile=logs/worker_fast.pid \
+       --detach
+
 log_success "Workers Celery iniciados"
 
 # Iniciar Flower (opcional)
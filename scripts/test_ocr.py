@@ -7,13 +7,34 @@ import os
 import sys
 import asyncio
 import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from ocr_integration import WalksBankOCR
 
+# orjson é opcional - sem ele a saída usa o json da biblioteca padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Sessão HTTP única: as verificações reaproveitam a conexão keep-alive
+_SESSION = requests.Session()
+_SESSION.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=64,
+                                      max_retries=Retry(total=3, backoff_factor=0.2)))
+
+def dump_json(data) -> str:
+    """Formata um resultado como JSON indentado"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
 async def test_single_document():
     """Testa processamento de um documento único"""
     print("🧪 Teste de documento único")
     print("-" * 30)
     
+    ocr = None
     try:
         # Inicializar OCR
         api_key = os.getenv('OPENROUTER_API_KEY')
@@ -42,13 +63,16 @@ async def test_single_document():
         }
         
         print("✅ Resultado do processamento:")
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        print(dump_json(result))
         
         return True
         
     except Exception as e:
         print(f"❌ Erro no teste: {e}")
         return False
+    finally:
+        if ocr is not None:
+            await ocr.aclose()
 
 async def test_api_connection():
     """Testa conexão com a API"""
@@ -56,10 +80,8 @@ async def test_api_connection():
     print("-" * 30)
     
     try:
-        import requests
-        
         # Testar health check
-        response = requests.get('http://localhost:5000/health', timeout=5)
+        response = _SESSION.get('http://localhost:5000/health', timeout=5)
         
         if response.status_code == 200:
             data = response.json()
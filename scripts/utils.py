@@ -1,21 +1,69 @@
+import os
 import re
 import base64
 import hashlib
-from typing import Dict, List, Optional, Tuple
+import unicodedata
+from typing import Collection, Dict, List, Optional, Tuple
 from datetime import datetime
 import logging
 
+try:
+    from scripts.config import EnvironmentValidator
+except ImportError:
+    from config import EnvironmentValidator
+
 logger = logging.getLogger(__name__)
 
+# Tabela de tradução que remove todo caractere ASCII que não seja dígito
+_NON_DIGITS = str.maketrans('', '', ''.join(chr(c) for c in range(128) if not chr(c).isdigit()))
+_NON_DIGIT_RE = re.compile(r'[^\d]')
+# Letras acentuadas do português mapeadas direto para ASCII
+_ACCENT_MAP = str.maketrans(
+    'ÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑáàâãäéèêëíìîïóòôõöúùûüçñ',
+    'AAAAAEEEEIIIIOOOOOUUUUCNaaaaaeeeeiiiiooooouuuucn'
+)
+# Extensões aceitas por padrão no upload (mesmas de config.supported_formats)
+_ALLOWED_FILE_TYPES = frozenset({'.jpg', '.jpeg', '.png', '.pdf'})
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+def _only_digits(value: str) -> str:
+    """Mantém apenas os dígitos de value"""
+    clean = value.translate(_NON_DIGITS)
+    # Caracteres fora do ASCII (raros) seguem pelo caminho da regex
+    return clean if clean.isascii() else _NON_DIGIT_RE.sub('', clean)
+
+
+# Pesos dos dígitos verificadores (algoritmo oficial da Receita)
+_CPF_W1 = tuple(range(10, 1, -1))
+_CPF_W2 = tuple(range(11, 1, -1))
+_CNPJ_W1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_CNPJ_W2 = (6,) + _CNPJ_W1
+
+
+def _ascii_digits(clean: str) -> str:
+    """Converte dígitos fora do ASCII (raros) para ASCII, como _check_digit espera"""
+    return clean if clean.isascii() else ''.join(str(int(char)) for char in clean)
+
+
+def _check_digit(digits: str, weights: Tuple[int, ...]) -> int:
+    """Dígito verificador (módulo 11) usado por CPF e CNPJ"""
+    # ord(c) - 48 converte o dígito ASCII sem passar por int(); resto < 2 vira 0 sem desvio
+    remainder = sum((ord(digit) - 48) * weight for digit, weight in zip(digits, weights)) % 11
+    return (11 - remainder) * (remainder >= 2)
+
+
+# Chave opcional do hash de dados sensíveis (BLAKE2b aceita no máximo 64 bytes)
+_HASH_KEY = EnvironmentValidator.validate_all()['config']['LOG_HASH_KEY'].encode('utf-8')[:64]
+_HASH_BASE = hashlib.blake2b(digest_size=16, key=_HASH_KEY)
+
 class DataProcessor:
     """Utilitários para processamento de dados"""
     
     @staticmethod
     def clean_cnpj(cnpj: str) -> str:
         """Remove formatação do CNPJ"""
-        if not cnpj:
-            return ""
-        return re.sub(r'[^\d]', '', cnpj)
+        return _only_digits(cnpj) if cnpj else ""
     
     @staticmethod
     def format_cnpj(cnpj: str) -> str:
@@ -28,9 +76,7 @@ class DataProcessor:
     @staticmethod
     def clean_cpf(cpf: str) -> str:
         """Remove formatação do CPF"""
-        if not cpf:
-            return ""
-        return re.sub(r'[^\d]', '', cpf)
+        return _only_digits(cpf) if cpf else ""
     
     @staticmethod
     def format_cpf(cpf: str) -> str:
@@ -43,9 +89,7 @@ class DataProcessor:
     @staticmethod
     def clean_phone(phone: str) -> str:
         """Remove formatação do telefone"""
-        if not phone:
-            return ""
-        return re.sub(r'[^\d]', '', phone)
+        return _only_digits(phone) if phone else ""
     
     @staticmethod
     def format_phone(phone: str) -> str:
@@ -60,9 +104,7 @@ class DataProcessor:
     @staticmethod
     def clean_cep(cep: str) -> str:
         """Remove formatação do CEP"""
-        if not cep:
-            return ""
-        return re.sub(r'[^\d]', '', cep)
+        return _only_digits(cep) if cep else ""
     
     @staticmethod
     def format_cep(cep: str) -> str:
@@ -78,10 +120,11 @@ class DataProcessor:
         if not text:
             return ""
         
-        # Remover acentos
-        import unicodedata
-        text = unicodedata.normalize('NFD', text)
-        text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+        # Remover acentos: tabela para os casos comuns, NFD só para o que sobrar
+        text = text.translate(_ACCENT_MAP)
+        if not text.isascii():
+            text = unicodedata.normalize('NFD', text)
+            text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
         
         # Converter para maiúsculo e remover espaços extras
         return ' '.join(text.upper().split())
@@ -109,21 +152,11 @@ class Validator:
         if len(set(clean)) == 1:
             return False, "CNPJ inválido"
         
-        # Calcular primeiro dígito verificador
-        weights1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        sum1 = sum(int(clean[i]) * weights1[i] for i in range(12))
-        digit1 = 11 - (sum1 % 11)
-        if digit1 >= 10:
-            digit1 = 0
+        digits = _ascii_digits(clean)
+        digit1 = _check_digit(digits, _CNPJ_W1)
+        digit2 = _check_digit(digits, _CNPJ_W2)
         
-        # Calcular segundo dígito verificador
-        weights2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        sum2 = sum(int(clean[i]) * weights2[i] for i in range(13))
-        digit2 = 11 - (sum2 % 11)
-        if digit2 >= 10:
-            digit2 = 0
-        
-        if int(clean[12]) == digit1 and int(clean[13]) == digit2:
+        if digits[12:14] == f"{digit1}{digit2}":
             return True, "CNPJ válido"
         else:
             return False, "CNPJ inválido"
@@ -148,19 +181,11 @@ class Validator:
         if len(set(clean)) == 1:
             return False, "CPF inválido"
         
-        # Calcular primeiro dígito verificador
-        sum1 = sum(int(clean[i]) * (10 - i) for i in range(9))
-        digit1 = 11 - (sum1 % 11)
-        if digit1 >= 10:
-            digit1 = 0
-        
-        # Calcular segundo dígito verificador
-        sum2 = sum(int(clean[i]) * (11 - i) for i in range(10))
-        digit2 = 11 - (sum2 % 11)
-        if digit2 >= 10:
-            digit2 = 0
+        digits = _ascii_digits(clean)
+        digit1 = _check_digit(digits, _CPF_W1)
+        digit2 = _check_digit(digits, _CPF_W2)
         
-        if int(clean[9]) == digit1 and int(clean[10]) == digit2:
+        if digits[9:11] == f"{digit1}{digit2}":
             return True, "CPF válido"
         else:
             return False, "CPF inválido"
@@ -171,8 +196,7 @@ class Validator:
         if not email:
             return False, "Email não informado"
         
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if re.match(pattern, email):
+        if _EMAIL_RE.match(email):
             return True, "Email válido"
         else:
             return False, "Formato de email inválido"
@@ -199,7 +223,9 @@ class SecurityUtils:
         if not data:
             return ""
         
-        return hashlib.sha256(data.encode()).hexdigest()
+        hasher = _HASH_BASE.copy()
+        hasher.update(data.encode('utf-8'))
+        return hasher.hexdigest()
     
     @staticmethod
     def mask_cpf(cpf: str) -> str:
@@ -224,13 +250,13 @@ class SecurityUtils:
         return cnpj
     
     @staticmethod
-    def validate_file_type(filename: str, allowed_types: List[str]) -> bool:
-        """Valida tipo de arquivo"""
+    def validate_file_type(filename: str, allowed_types: Optional[Collection[str]] = None) -> bool:
+        """Valida tipo de arquivo (prefira passar um frozenset de extensões)"""
         if not filename:
             return False
         
-        ext = '.' + filename.split('.')[-1].lower()
-        return ext in allowed_types
+        allowed = _ALLOWED_FILE_TYPES if allowed_types is None else allowed_types
+        return os.path.splitext(filename)[1].lower() in allowed
 
 class LogUtils:
     """Utilitários de logging"""